@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+#
+# Generate a synthetic reclass inventory for benchmarking.
+#
+# Classes are laid out in levels: level 0 holds `width` classes including a
+# common base class, every class on a higher level includes `fanout` classes
+# of the level below, and every node includes `fanout` classes of the top
+# level. All classes merge into a shared list and dict and carry references
+# to parameters of the base class, a part of the nodes runs inventory
+# queries against the exports of all nodes.
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import optparse
+import os
+import random
+import shutil
+
+import yaml
+
+ROLES = ('web', 'db', 'cache', 'queue')
+
+
+def class_name(level, index):
+    return 'level{0}.class{1}'.format(level, index)
+
+
+def base_class(refs):
+    return {'parameters': {'_param': dict(('base_key{0}'.format(i), 'value{0}'.format(i))
+                                          for i in range(refs)),
+                           'shared_list': [],
+                           'shared_dict': {}}}
+
+
+def make_class(rng, level, index, width, fanout, refs, merge_volume):
+    name = class_name(level, index)
+    if level == 0:
+        classes = ['base']
+    else:
+        classes = [ class_name(level - 1, i) for i in rng.sample(range(width), min(fanout, width)) ]
+    key = name.replace('.', '_')
+    parameters = {
+        key: dict(('ref{0}'.format(i), '${{_param:base_key{0}}}-{1}'.format(i % max(refs, 1), key))
+                  for i in range(refs)),
+        'shared_list': [ '{0}-item{1}'.format(key, i) for i in range(merge_volume) ],
+        'shared_dict': dict(('{0}_key{1}'.format(key, i), i) for i in range(merge_volume)),
+    }
+    return {'classes': classes, 'parameters': parameters}
+
+
+def make_node(rng, index, depth, width, fanout, queries):
+    top = depth - 1
+    classes = [ class_name(top, i) for i in rng.sample(range(width), min(fanout, width)) ]
+    role = ROLES[index % len(ROLES)]
+    node = {
+        'classes': classes,
+        'parameters': {'node_index': index,
+                       'role': role,
+                       'address': '10.{0}.{1}.{2}'.format(index // 65536 % 256, index // 256 % 256, index % 256)},
+        'exports': {'address': '${address}', 'role': '${role}'},
+    }
+    if queries:
+        node['parameters']['peers'] = '$[ exports:address ]'
+        node['parameters']['same_role'] = '$[ exports:address if exports:role == {0} ]'.format(role)
+    return node
+
+
+def write_yaml(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as fp:
+        yaml.safe_dump(data, fp, default_flow_style=False)
+
+
+def generate(target, nodes=100, depth=3, width=10, fanout=3, refs=5,
+             query_density=0.1, merge_volume=5, seed=0, force=False):
+    '''
+    Write an inventory with the given shape below target, which must not
+    hold anything unless force is set to replace its contents
+    '''
+    rng = random.Random(seed)
+    if os.path.exists(target) and (not os.path.isdir(target) or os.listdir(target)):
+        if not force:
+            raise ValueError('{0} is not an empty directory'.format(target))
+        shutil.rmtree(target)
+    classes_dir = os.path.join(target, 'classes')
+    nodes_dir = os.path.join(target, 'nodes')
+    write_yaml(os.path.join(classes_dir, 'base.yml'), base_class(refs))
+    for level in range(depth):
+        for index in range(width):
+            path = os.path.join(classes_dir, 'level{0}'.format(level), 'class{0}.yml'.format(index))
+            write_yaml(path, make_class(rng, level, index, width, fanout, refs, merge_volume))
+    with_queries = set(rng.sample(range(nodes), int(round(nodes * query_density))))
+    for index in range(nodes):
+        path = os.path.join(nodes_dir, 'node{0:05d}.yml'.format(index))
+        write_yaml(path, make_node(rng, index, depth, width, fanout, index in with_queries))
+    return target
+
+
+def make_option_parser():
+    parser = optparse.OptionParser(usage='%prog [options] TARGET')
+    parser.description = 'Generate a synthetic reclass inventory in TARGET'
+    parser.add_option('--nodes', type='int', default=100, help='number of nodes [%default]')
+    parser.add_option('--depth', type='int', default=3, help='levels of classes [%default]')
+    parser.add_option('--width', type='int', default=10, help='classes per level [%default]')
+    parser.add_option('--fanout', type='int', default=3,
+                      help='classes included by every class and node [%default]')
+    parser.add_option('--refs', type='int', default=5, help='references per class [%default]')
+    parser.add_option('--query-density', type='float', default=0.1,
+                      help='share of nodes with inventory queries [%default]')
+    parser.add_option('--merge-volume', type='int', default=5,
+                      help='list items and dict keys every class merges [%default]')
+    parser.add_option('--seed', type='int', default=0, help='random seed [%default]')
+    return parser
+
+
+def generator_options(options):
+    return dict(nodes=options.nodes, depth=options.depth, width=options.width,
+                fanout=options.fanout, refs=options.refs,
+                query_density=options.query_density,
+                merge_volume=options.merge_volume, seed=options.seed)
+
+
+def main():
+    parser = make_option_parser()
+    parser.add_option('--force', action='store_true',
+                      help='replace the contents of a TARGET which is not empty')
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('Need exactly one TARGET directory')
+    try:
+        generate(args[0], force=options.force, **generator_options(options))
+    except ValueError as e:
+        parser.error('{0}, use --force to replace its contents'.format(e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+#
+# Micro-benchmarks of the primitives reclass spends most of its time in.
+#
+# Every case builds fresh inputs outside of the timed section, as most of
+# the measured operations change their inputs. The figure reported for a
+# case is the best time per call over all repeats, which is the least
+# disturbed by other load on the machine.
+#
+# Results can be saved as a baseline and later runs compared against it,
+# flagging every case that got slower by more than the threshold. Timings
+# only compare on the machine they were taken on, so the baseline is made
+# locally and not kept in the repository.
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import importlib
+import itertools
+import json
+import optparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLE_DIR = os.path.dirname(HERE)
+DEFAULT_BASELINE = os.path.join(HERE, 'micro_baseline.json')
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class Cases(object):
+    '''
+    The benchmark cases, every case_* method returns a pair of functions:
+    setup() builds the input of one call and run(input) is what is timed.
+    '''
+
+    def __init__(self, package):
+        load = lambda name: importlib.import_module('{0}.{1}'.format(package, name))
+        self.Settings = load('settings').Settings
+        self.Parser = load('values.parser').Parser
+        self.DictPath = load('utils.dictpath').DictPath
+        self.Parameters = load('datatypes').Parameters
+        self.Value = load('values.value').Value
+        self.ValueList = load('values.valuelist').ValueList
+        self.Inventory = load('utils.inventory').Inventory
+        self.settings = self.Settings({})
+
+    def names(self):
+        return sorted(n[len('case_'):] for n in dir(self) if n.startswith('case_'))
+
+    def get(self, name):
+        return getattr(self, 'case_' + name)()
+
+    def _parse(self, template):
+        # every call parses a string not seen before, so that the caches of
+        # parsed items and queries measure nothing but their misses
+        parser = self.Parser()
+        count = itertools.count()
+        return (lambda: template.format(next(count))), (lambda v: parser.parse(v, self.settings))
+
+    def case_parse_plain(self):
+        return self._parse('just a plain string without references {0}')
+
+    def case_parse_reference(self):
+        return self._parse('${{some:nested:reference{0}}}')
+
+    def case_parse_composite(self):
+        return self._parse('prefix-${{some:reference}}-${{another:one{0}}}-suffix')
+
+    def case_parse_inv_query(self):
+        return self._parse('$[ exports:address if exports:role == web{0} ]')
+
+    def case_dictpath_get_value(self):
+        base = {'a': {'b': {'c': {'d': {'e': 42}}}}}
+        path = self.DictPath(':', 'a:b:c:d:e')
+        return (lambda: None), (lambda _: path.get_value(base))
+
+    def case_dictpath_hash(self):
+        paths = [ self.DictPath(':', 'section{0}:key{1}:leaf'.format(i % 10, i)) for i in range(100) ]
+        return (lambda: None), (lambda _: set(paths))
+
+    def _tree(self, prefix, keys, depth, reference=None):
+        if depth == 0:
+            return dict(('{0}{1}'.format(prefix, i), reference or 'value{0}'.format(i)) for i in range(keys))
+        return dict(('{0}{1}'.format(prefix, i), self._tree(prefix, keys, depth - 1, reference))
+                    for i in range(keys))
+
+    def case_parameters_merge(self):
+        first = self._tree('key', 6, 3)
+        second = self._tree('key', 6, 3)
+        second['list'] = list(range(50))
+        def setup():
+            return (self.Parameters(first, self.settings, 'first'),
+                    self.Parameters(second, self.settings, 'second'))
+        def run(params):
+            merged = self.Parameters({}, self.settings, '')
+            merged.merge(params[0])
+            merged.merge(params[1])
+        return setup, run
+
+    def case_parameters_interpolate(self):
+        mapping = {'base': dict(('value{0}'.format(i), i) for i in range(20))}
+        mapping['refs'] = dict(('ref{0}'.format(i), '${{base:value{0}}}'.format(i % 20)) for i in range(200))
+        mapping['chain'] = dict(('link{0}'.format(i), '${{refs:ref{0}}}-${{chain:link{1}}}'.format(i, i - 1))
+                                for i in range(1, 50))
+        mapping['chain']['link0'] = 'start'
+        def setup():
+            params = self.Parameters({}, self.settings, '')
+            params.merge(self.Parameters(mapping, self.settings, 'refs'))
+            return params
+        return setup, (lambda params: params.interpolate())
+
+    def case_valuelist_render_dicts(self):
+        trees = [ self._tree('key{0}_'.format(n % 3), 5, 2) for n in range(10) ]
+        def setup():
+            values = [ self.Value(t, self.settings, 'tree') for t in trees ]
+            valuelist = self.ValueList(values[0], self.settings)
+            for value in values[1:]:
+                valuelist.append(value)
+            return valuelist
+        return setup, (lambda valuelist: valuelist.render({}, None))
+
+    def case_valuelist_append(self):
+        # a key overridden by many classes, some of them with references
+        # and inventory queries
+        strings = [ ('${{base:value{0}}}' if n % 3 else '$[ exports:address{0} ]').format(n)
+                    for n in range(30) ]
+        def setup():
+            return [ self.Value(s, self.settings, 'class{0}'.format(n)) for n, s in enumerate(strings) ]
+        def run(values):
+            valuelist = self.ValueList(values[0], self.settings)
+            for value in values[1:]:
+                valuelist.append(value)
+        return setup, run
+
+    def case_invitem_test_expression(self):
+        item = self.Parser().parse('$[ exports:address if exports:role == web ]', self.settings)
+        roles = ('web', 'db', 'cache', 'queue')
+        inventory = dict(('node{0}'.format(i), {'address': '10.0.{0}.{1}'.format(i // 256, i % 256),
+                                                'role': roles[i % len(roles)]})
+                         for i in range(2000))
+        return (lambda: None), (lambda _: item._test_expression({}, inventory))
+
+    def case_invitem_indexed_query(self):
+        # the exports of all nodes are indexed by the first query
+        item = self.Parser().parse('$[ exports:address if exports:cluster == self:cluster ]', self.settings)
+        inventory = self.Inventory(('node{0}'.format(i), {'address': '10.{0}.{1}'.format(i // 256, i % 256),
+                                                          'cluster': 'cluster{0}'.format(i % 1000)})
+                                   for i in range(10000))
+        context = {'cluster': 'cluster42'}
+        item.render(context, inventory)
+        return (lambda: None), (lambda _: item.render(context, inventory))
+
+
+def _time(setup, run, number):
+    inputs = [ setup() for _ in range(number) ]
+    start = _clock()
+    for i in inputs:
+        run(i)
+    return (_clock() - start) / number
+
+
+def measure(setup, run, number, repeat, min_time=0.05):
+    if number is None:
+        # like timeit, raise the calls per repeat until one takes long enough
+        number = 1
+        while number < 100000 and _time(setup, run, number) * number < min_time:
+            number *= 10
+    return min(_time(setup, run, number) for _ in range(repeat))
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print('{0:<28} {1:>12} {2:>12} {3:>8}'.format('case', 'baseline us', 'current us', 'ratio'))
+    for name in sorted(results):
+        if name not in baseline:
+            print('{0:<28} {1:>12} {2:>12.2f} {3:>8}'.format(name, '-', results[name] * 1e6, '-'))
+            continue
+        ratio = results[name] / baseline[name]
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('{0:<28} {1:>12.2f} {2:>12.2f} {3:>8.2f}{4}'.format(name, baseline[name] * 1e6,
+                                                                 results[name] * 1e6, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.description = 'Time the hot primitives of reclass and compare them to a baseline'
+    parser.add_option('--package', default='reclass', choices=('reclass', 'build'),
+                      help='package to benchmark [%default]')
+    parser.add_option('--case', action='append',
+                      help='only run this case, may be given several times')
+    parser.add_option('--list', action='store_true', help='list the cases and exit')
+    parser.add_option('--number', type='int',
+                      help='calls per repeat [enough for a repeat to take 50ms]')
+    parser.add_option('--repeat', type='int', default=5, help='repeats per case [%default]')
+    parser.add_option('--baseline', metavar='FILE', default=DEFAULT_BASELINE,
+                      help='baseline file to save to or compare with [%default]')
+    parser.add_option('--save', action='store_true',
+                      help='store the results as the baseline')
+    parser.add_option('--compare', action='store_true',
+                      help='compare the results to the baseline')
+    parser.add_option('--threshold', type='float', default=0.25,
+                      help='slow down relative to the baseline counted as regression [%default]')
+    options, args = parser.parse_args()
+    if len(args) > 0:
+        parser.error('No arguments allowed')
+
+    sys.path.insert(0, EXAMPLE_DIR)
+    cases = Cases(options.package)
+    names = cases.names()
+    if options.list:
+        print('\n'.join(names))
+        return
+    if options.case:
+        unknown = set(options.case) - set(names)
+        if unknown:
+            parser.error('Unknown cases: {0}'.format(', '.join(sorted(unknown))))
+        names = [ n for n in names if n in options.case ]
+
+    if options.compare and not os.path.exists(options.baseline):
+        parser.error('No baseline at {0}, store one with --save first'.format(options.baseline))
+
+    results = {}
+    for name in names:
+        setup, run = cases.get(name)
+        results[name] = measure(setup, run, options.number, options.repeat)
+
+    if options.compare:
+        with open(options.baseline) as fp:
+            baseline = json.load(fp)['results']
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print('{0} case(s) slower than the baseline by more than {1:.0%}'.format(
+                  len(regressions), options.threshold), file=sys.stderr)
+            sys.exit(1)
+    else:
+        for name in names:
+            print('{0:<28} {1:>12.2f} us'.format(name, results[name] * 1e6))
+
+    if options.save:
+        with open(options.baseline, 'w') as fp:
+            json.dump({'package': options.package, 'python': sys.version.split()[0],
+                       'results': results}, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+#
+# Time `--inventory` and `--nodeinfo` of the pure python `reclass` package
+# and of the cythonized `build` package on a synthetic inventory.
+#
+# Every measured call runs in a process of its own, so the figures include
+# interpreter start-up just like a real invocation. Peak RSS is taken from
+# the resource usage of each finished child.
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_inventory import make_option_parser, generator_options, generate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLE_DIR = os.path.dirname(HERE)
+PACKAGES = ('reclass', 'build')
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+def run_once(package, args):
+    ''' Run the cli of package once, returning (seconds, peak RSS in KiB) '''
+    command = [sys.executable, '-c', 'import {0}.cli; {0}.cli.main()'.format(package)] + args
+    with open(os.devnull, 'wb') as devnull:
+        start = time.time()
+        process = subprocess.Popen(command, cwd=EXAMPLE_DIR, stdout=devnull)
+        pid, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.time() - start
+    if status != 0:
+        raise RuntimeError('{0} failed: {1}'.format(' '.join(command), status))
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    rss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return elapsed, rss
+
+
+def summarise(times, rss):
+    return {'runs': len(times),
+            'mean': sum(times) / len(times),
+            'p50': percentile(times, 50),
+            'p90': percentile(times, 90),
+            'p99': percentile(times, 99),
+            'peak_rss_kib': rss}
+
+
+def benchmark(package, inventory, nodenames, options):
+    base = ['-b', inventory] + options.reclass_args.split()
+    runs = [ run_once(package, base + ['--inventory']) for _ in range(options.runs) ]
+    inventory = summarise([ t for (t, rss) in runs ], max(rss for (t, rss) in runs))
+    inventory['nodes_per_second'] = len(nodenames) / inventory['mean']
+
+    sample = random.Random(options.seed).sample(nodenames, min(options.samples, len(nodenames)))
+    runs = [ run_once(package, base + ['--nodeinfo', n]) for n in sample ]
+    nodeinfo = summarise([ t for (t, rss) in runs ], max(rss for (t, rss) in runs))
+    nodeinfo['nodes_per_second'] = 1 / nodeinfo['mean']
+    return {'inventory': inventory, 'nodeinfo': nodeinfo}
+
+
+def report(results):
+    header = '{0:<8} {1:<9} {2:>6} {3:>9} {4:>9} {5:>9} {6:>9} {7:>10} {8:>10}'
+    row = '{0:<8} {1:<9} {2:>6} {3:>9.3f} {4:>9.3f} {5:>9.3f} {6:>9.3f} {7:>10.1f} {8:>10.1f}'
+    print(header.format('package', 'mode', 'runs', 'mean s', 'p50 s', 'p90 s', 'p99 s', 'nodes/s', 'RSS MiB'))
+    for package in sorted(results):
+        for mode in ('inventory', 'nodeinfo'):
+            r = results[package][mode]
+            print(row.format(package, mode, r['runs'], r['mean'], r['p50'], r['p90'], r['p99'],
+                             r['nodes_per_second'], r['peak_rss_kib'] / 1024.0))
+
+
+def main():
+    parser = make_option_parser()
+    parser.set_usage('%prog [options]')
+    parser.description = 'Benchmark reclass on a synthetic or given inventory'
+    parser.add_option('--inventory', help='use this inventory instead of generating one')
+    parser.add_option('--package', action='append', choices=PACKAGES,
+                      help='package to benchmark, may be given several times [all available]')
+    parser.add_option('--runs', type='int', default=5, help='runs of --inventory [%default]')
+    parser.add_option('--samples', type='int', default=20,
+                      help='nodes to time --nodeinfo for [%default]')
+    parser.add_option('--reclass-args', default='',
+                      help='extra arguments passed to every reclass run, like "-j 4"')
+    parser.add_option('--json', help='also write the results as JSON to this file')
+    options, args = parser.parse_args()
+    if len(args) > 0:
+        parser.error('No arguments allowed')
+
+    packages = options.package
+    if not packages:
+        packages = [ p for p in PACKAGES if os.path.isdir(os.path.join(EXAMPLE_DIR, p)) ]
+        if 'build' not in packages:
+            print('No build package, run ./cythonize.sh to benchmark it too', file=sys.stderr)
+
+    workdir = None
+    inventory = options.inventory
+    if inventory is None:
+        workdir = tempfile.mkdtemp(prefix='reclass-bench-')
+        inventory = generate(os.path.join(workdir, 'inventory'), **generator_options(options))
+    inventory = os.path.abspath(inventory)
+    nodenames = sorted(os.path.splitext(f)[0]
+                       for (dirpath, dirnames, filenames) in os.walk(os.path.join(inventory, 'nodes'))
+                       for f in filenames if f.endswith('.yml'))
+
+    try:
+        results = {}
+        for package in packages:
+            results[package] = benchmark(package, inventory, nodenames, options)
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir)
+
+    report(results)
+    if options.json:
+        with open(options.json, 'w') as fp:
+            json.dump({'nodes': len(nodenames), 'results': results}, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
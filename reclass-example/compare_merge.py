@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+#
+# Compare the merge of rendered dicts in ValueList.render against merging
+# them as Parameters and rendering the result, which it replaces, on random
+# class stacks made of dicts with override (~) and constant (=) keys, None
+# values and references to such dicts.
+#
+# Usage: compare_merge.py [--count N] [--seed S]
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import copy
+import optparse
+import random
+import sys
+
+from reclass.datatypes import Parameters
+from reclass.errors import ChangedConstantError, InterpolationError, ResolveError, TypeMergeError
+from reclass.settings import Settings
+from reclass.values.valuelist import ValueList
+
+OPTIONS = ['allow_scalar_over_dict', 'allow_scalar_over_list', 'allow_list_over_scalar',
+           'allow_dict_over_scalar', 'allow_none_override', 'strict_constant_parameters']
+
+
+def baseline_render(self, context, inventory):
+    ''' ValueList.render as it was, merging dicts as Parameters '''
+    output = None
+    deepCopied = False
+    last_error = None
+    constant = False
+    for n, value in enumerate(self._values):
+        try:
+            new = value.render(context, inventory)
+        except ResolveError as e:
+            if (self._settings.ignore_overwritten_missing_references
+                    and not isinstance(output, (dict, list))
+                    and n != (len(self._values)-1)):
+                new = None
+                last_error = e
+            else:
+                raise e
+
+        if constant:
+            if self._settings.strict_constant_parameters:
+                raise ChangedConstantError('{0}; {1}'.format(self._values[n-1].uri, self._values[n].uri))
+            else:
+                continue
+
+        if output is None or value.overwrite:
+            output = new
+            deepCopied = False
+        else:
+            if isinstance(output, dict):
+                if isinstance(new, dict):
+                    p1 = Parameters(output, self._settings, None, parse_strings=False)
+                    p2 = Parameters(new, self._settings, None, parse_strings=False)
+                    p1.merge(p2)
+                    output = p1.as_dict()
+                elif isinstance(new, list):
+                    raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
+                elif self._settings.allow_scalar_over_dict or (self._settings.allow_none_override and new is None):
+                    output = new
+                    deepCopied = False
+                else:
+                    raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
+            elif isinstance(output, list):
+                if isinstance(new, list):
+                    if not deepCopied:
+                        output = copy.deepcopy(output)
+                        deepCopied = True
+                    output.extend(new)
+                elif isinstance(new, dict):
+                    raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
+                elif self._settings.allow_scalar_over_list or (self._settings.allow_none_override and new is None):
+                    output = new
+                    deepCopied = False
+                else:
+                    raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
+            else:
+                if isinstance(new, dict):
+                    if self._settings.allow_dict_over_scalar:
+                        output = new
+                        deepCopied = False
+                    else:
+                        raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
+                elif isinstance(new, list):
+                    if self._settings.allow_list_over_scalar:
+                        output_list = list()
+                        output_list.append(output)
+                        output_list.extend(new)
+                        output = output_list
+                        deepCopied = True
+                    else:
+                        raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
+                else:
+                    output = new
+                    deepCopied = False
+
+        if value.constant:
+            constant = True
+
+    if isinstance(output, (dict, list)) and last_error is not None:
+        raise last_error
+
+    return output
+
+
+def random_tree(rng, depth):
+    ''' A dict whose keys differ once their prefix is dropped '''
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice([1, 2, 'x', None, None, [1], [2, 3]])
+    keys = rng.sample(['a', 'b', 'c'], rng.randint(1, 3))
+    return dict((rng.choice(['', '', '~', '=']) + k, random_tree(rng, depth - 1)) for k in keys)
+
+
+def random_classes(rng):
+    ''' Class parameters merging some dicts directly and others by reference '''
+    trees = [ random_tree(rng, 3) for _ in range(rng.randint(2, 4)) ]
+    classes = [ {'top': '${d}'}, {'d': trees[0]} ]
+    for n, tree in enumerate(trees[1:]):
+        name = 'r{0}'.format(n)
+        classes.append({name: tree})
+        classes.append({'d': '${{{0}}}'.format(name)})
+    return classes
+
+
+def interpolate(classes, settings):
+    ''' The interpolated parameters, or the type of the error raised '''
+    params = Parameters({}, settings, '')
+    try:
+        for n, c in enumerate(classes):
+            params.merge(Parameters(c, settings, 'class{0}'.format(n)))
+        params.interpolate()
+    except InterpolationError as e:
+        return type(e).__name__
+    return params.as_dict()
+
+
+def compare(classes, settings):
+    ''' Return a description of the difference, or None if there is none '''
+    current = interpolate(classes, settings)
+    render = ValueList.render
+    ValueList.render = baseline_render
+    try:
+        baseline = interpolate(classes, settings)
+    finally:
+        ValueList.render = render
+    if isinstance(current, str) and isinstance(baseline, str):
+        # with several errors either may be raised first
+        return None
+    if current != baseline:
+        return 'current: {0!r}\nbaseline: {1!r}'.format(current, baseline)
+    return None
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('--count', type='int', default=3000, help='class stacks to try [%default]')
+    parser.add_option('--seed', type='int', default=0, help='random seed [%default]')
+    options, args = parser.parse_args()
+
+    rng = random.Random(options.seed)
+    failures = 0
+    for _ in range(options.count):
+        opts = dict((o, rng.random() < 0.5) for o in OPTIONS)
+        classes = random_classes(rng)
+        difference = compare(classes, Settings(opts))
+        if difference is not None:
+            failures += 1
+            print('{0!r}\n{1!r}\n{2}\n'.format(opts, classes, difference))
+    print('{0} class stacks, {1} differences'.format(options.count, failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Compare the hand-written reference scanner against the pyparsing grammar
+# it replaces, on random strings built from the characters that matter to
+# them and on all strings found in the YAML files of the given directories.
+#
+# Usage: compare_scanner.py [--count N] [--seed S] [DIR ...]
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import optparse
+import os
+import random
+import sys
+
+import pyparsing as pp
+import six
+import yaml
+
+from reclass.settings import Settings
+import reclass.values.parser_funcs as parsers
+
+ALPHABET = ['$', '{', '}', '[', ']', '\\', ' ', '\n', 'a', 'b', ':',
+            '${', '$[', '\\${', '\\\\${', '\\}', '\\\\}', '\\$[', '\\]', 'exports:x']
+
+
+def strings_in(data):
+    if isinstance(data, dict):
+        for k, v in data.items():
+            for s in strings_in(k):
+                yield s
+            for s in strings_in(v):
+                yield s
+    elif isinstance(data, list):
+        for v in data:
+            for s in strings_in(v):
+                yield s
+    elif isinstance(data, six.string_types):
+        yield data
+
+
+def yaml_strings(top):
+    for dirpath, dirnames, filenames in os.walk(top):
+        for f in filenames:
+            if f.endswith('.yml') or f.endswith('.yaml'):
+                with open(os.path.join(dirpath, f)) as fp:
+                    for s in strings_in(yaml.safe_load(fp)):
+                        yield s
+
+
+def compare(value, parser, scanner):
+    ''' Return a description of the difference, or None if there is none '''
+    scanned = scanner(value)
+    try:
+        parsed = parsers.listify(parser.parseString(value))
+    except pp.ParseException:
+        parsed = None
+    if scanned is None:
+        # left to pyparsing, which is always right
+        return None
+    if scanned != parsed:
+        return 'scanner: {0!r}\npyparsing: {1!r}'.format(scanned, parsed)
+    return None
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [DIR ...]')
+    parser.add_option('--count', type='int', default=20000, help='random strings to try [%default]')
+    parser.add_option('--seed', type='int', default=0, help='random seed [%default]')
+    options, dirs = parser.parse_args()
+
+    settings = Settings({})
+    ref_parser = parsers.get_ref_parser(settings)
+    scanner = parsers.get_ref_scanner(settings)
+    rng = random.Random(options.seed)
+
+    values = [ ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 12)))
+               for _ in range(options.count) ]
+    for top in dirs:
+        values.extend(yaml_strings(top))
+
+    values = [ v for v in values if '$' in v ]
+    failures = 0
+    scanned = 0
+    for value in values:
+        scanned += scanner(value) is not None
+        difference = compare(value, ref_parser, scanner)
+        if difference is not None:
+            failures += 1
+            print('{0!r}\n{1}\n'.format(value, difference))
+    print('{0} strings, {1} scanned, {2} left to pyparsing, {3} differences'.format(
+          len(values), scanned, len(values) - scanned, failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
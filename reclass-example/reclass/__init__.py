@@ -26,3 +26,8 @@ def output(data, fmt, pretty_print=False, no_refs=False):
     output_class = OutputLoader(fmt).load()
     outputter = output_class()
     return outputter.dump(data, pretty_print=pretty_print, no_refs=no_refs)
+
+def output_stream(items, fmt, pretty_print=False, no_refs=False):
+    output_class = OutputLoader(fmt).load()
+    outputter = output_class()
+    return outputter.dump_stream(items, pretty_print=pretty_print, no_refs=no_refs)
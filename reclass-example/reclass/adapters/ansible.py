@@ -25,6 +25,7 @@ from six import iteritems
 
 from reclass import get_storage, output
 from reclass.core import Core
+from reclass.daemon import Client
 from reclass.errors import ReclassException
 from reclass.config import find_and_read_configfile, get_options
 from reclass.version import *
@@ -66,17 +67,28 @@ def cli():
                               add_options_cb=add_ansible_options_group,
                               defaults=defaults)
 
-        storage = get_storage(options.storage_type,
-                              options.nodes_uri,
-                              options.classes_uri,
-                              options.compose_node_name)
-        class_mappings = defaults.get('class_mappings')
-        defaults.update(vars(options))
-        settings = Settings(defaults)
-        reclass = Core(storage, class_mappings, settings)
+        def make_core():
+            storage = get_storage(options.storage_type,
+                                  options.nodes_uri,
+                                  options.classes_uri,
+                                  options.compose_node_name)
+            class_mappings = defaults.get('class_mappings')
+            defaults.update(vars(options))
+            settings = Settings(defaults)
+            return Core(storage, class_mappings, settings, workers=options.jobs,
+                        cache_dir=options.cache_dir)
+
+        if options.daemon_socket:
+            client = Client(options.daemon_socket, make_core, options.daemon_timeout)
+            nodeinfo = client.nodeinfo
+            inventory = client.inventory
+        else:
+            reclass = make_core()
+            nodeinfo = reclass.nodeinfo
+            inventory = reclass.inventory
 
         if options.mode == MODE_NODEINFO:
-            data = reclass.nodeinfo(options.hostname)
+            data = nodeinfo(options.hostname)
             # Massage and shift the data like Ansible wants it
             data['parameters']['__reclass__'] = data['__reclass__']
             for i in ('classes', 'applications'):
@@ -84,7 +96,7 @@ def cli():
             data = data['parameters']
 
         else:
-            data = reclass.inventory()
+            data = inventory()
             # Ansible inventory is only the list of groups. Groups are the set
             # of classes plus the set of applications with the postfix added:
             groups = data['classes']
@@ -17,6 +17,7 @@ from six import iteritems
 
 from reclass import get_storage, output, get_path_mangler
 from reclass.core import Core
+from reclass.daemon import Client
 from reclass.errors import ReclassException
 from reclass.config import find_and_read_configfile, get_options
 from reclass.constants import MODE_NODEINFO
@@ -32,18 +33,34 @@ def ext_pillar(minion_id, pillar,
                class_mappings=None,
                propagate_pillar_data_to_reclass=False,
                compose_node_name=OPT_COMPOSE_NODE_NAME,
+               cache_dir=OPT_CACHE_DIR,
+               daemon_socket=OPT_DAEMON_SOCKET,
+               daemon_timeout=OPT_DAEMON_TIMEOUT,
                **kwargs):
 
     path_mangler = get_path_mangler(storage_type)
     nodes_uri, classes_uri = path_mangler(inventory_base_uri, nodes_uri, classes_uri)
-    storage = get_storage(storage_type, nodes_uri, classes_uri, compose_node_name)
+
+    def make_core(input_data=None):
+        storage = get_storage(storage_type, nodes_uri, classes_uri, compose_node_name)
+        settings = Settings(kwargs)
+        return Core(storage, class_mappings, settings, input_data=input_data,
+                    cache_dir=cache_dir)
+
+    # the daemon cannot render with per-minion input data
+    if daemon_socket and not propagate_pillar_data_to_reclass:
+        client = Client(daemon_socket, make_core, daemon_timeout)
+        return _pillar_from_nodeinfo(minion_id, client.nodeinfo(minion_id))
+
     input_data = None
     if propagate_pillar_data_to_reclass:
         input_data = pillar
-    settings = Settings(kwargs)
-    reclass = Core(storage, class_mappings, settings, input_data=input_data)
+    reclass = make_core(input_data)
+
+    return _pillar_from_nodeinfo(minion_id, reclass.nodeinfo(minion_id))
 
-    data = reclass.nodeinfo(minion_id)
+
+def _pillar_from_nodeinfo(minion_id, data):
     params = data.get('parameters', {})
     params['__reclass__'] = {}
     params['__reclass__']['nodename'] = minion_id
@@ -56,25 +73,38 @@ def ext_pillar(minion_id, pillar,
 def top(minion_id, storage_type=OPT_STORAGE_TYPE,
         inventory_base_uri=OPT_INVENTORY_BASE_URI, nodes_uri=OPT_NODES_URI,
         classes_uri=OPT_CLASSES_URI, class_mappings=None, compose_node_name=OPT_COMPOSE_NODE_NAME,
-        **kwargs):
+        cache_dir=OPT_CACHE_DIR, daemon_socket=OPT_DAEMON_SOCKET,
+        daemon_timeout=OPT_DAEMON_TIMEOUT, **kwargs):
 
     path_mangler = get_path_mangler(storage_type)
     nodes_uri, classes_uri = path_mangler(inventory_base_uri, nodes_uri, classes_uri)
-    storage = get_storage(storage_type, nodes_uri, classes_uri, compose_node_name)
-    settings = Settings(kwargs)
-    reclass = Core(storage, class_mappings, settings, input_data=None)
+
+    def make_core():
+        storage = get_storage(storage_type, nodes_uri, classes_uri, compose_node_name)
+        settings = Settings(kwargs)
+        return Core(storage, class_mappings, settings, input_data=None,
+                    cache_dir=cache_dir)
+
+    if daemon_socket:
+        client = Client(daemon_socket, make_core, daemon_timeout)
+        nodeinfo = client.nodeinfo
+        inventory = client.inventory
+    else:
+        reclass = make_core()
+        nodeinfo = reclass.nodeinfo
+        inventory = reclass.inventory
 
     # if the minion_id is not None, then return just the applications for the
     # specific minion, otherwise return the entire top data (which we need for
     # CLI invocations of the adapter):
     if minion_id is not None:
-        data = reclass.nodeinfo(minion_id)
+        data = nodeinfo(minion_id)
         applications = data.get('applications', [])
         env = data['environment']
         return {env: applications}
 
     else:
-        data = reclass.inventory()
+        data = inventory()
         nodes = {}
         for (node_id, node_data) in iteritems(data['nodes']):
             env = node_data['environment']
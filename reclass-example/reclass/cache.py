@@ -0,0 +1,134 @@
+#
+# -*- coding: utf-8 -*-
+#
+# This file is part of reclass (http://github.com/madduck/reclass)
+#
+# Released under the terms of the Artistic Licence 2.0
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+from six.moves import cPickle as pickle
+
+from reclass.version import VERSION
+
+# bump whenever the layout of the cache entries changes
+CACHE_FORMAT = 2
+
+
+class NodeCache(object):
+    '''
+    On-disk cache of rendered nodes.
+
+    Every entry holds the nodeinfo of one node together with the fingerprints
+    of all node and class files it was built from, and their storage uris. An entry is only used as
+    long as all these fingerprints are unchanged and it was written with the
+    same settings, class mappings and input data.
+
+    Inventory queries are answered from all environments when rendering the
+    whole inventory but only from the node's own one otherwise, so entries
+    are kept separately for each scope.
+    '''
+
+    def __init__(self, path, storage, settings, class_mappings=None, input_data=None):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._storage = storage
+        self._key = self._cache_key(storage, settings, class_mappings, input_data)
+        self._fingerprints = {}
+        self._enabled = True
+        try:
+            os.makedirs(self._path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @staticmethod
+    def _cache_key(storage, settings, class_mappings, input_data):
+        data = {'format': CACHE_FORMAT,
+                'version': VERSION,
+                'python': sys.version_info[0],
+                'storage': storage.name,
+                'settings': dict((opt, getattr(settings, opt)) for opt in settings.known_opts),
+                'class_mappings': class_mappings,
+                'input_data': input_data
+               }
+        data = json.dumps(data, sort_keys=True, default=repr)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, nodename, scope):
+        name = hashlib.sha1(nodename.encode('utf-8')).hexdigest()
+        return os.path.join(self._path, '{0}-{1}.pickle'.format(scope, name))
+
+    def _fingerprint(self, dependency):
+        if dependency not in self._fingerprints:
+            kind, name, environment = dependency
+            if kind == 'node':
+                fp = self._storage.get_node_fingerprint(name)
+            elif kind == 'class':
+                fp = self._storage.get_class_fingerprint(name, environment)
+            else:
+                nodes = '\n'.join(sorted(self._storage.enumerate_nodes()))
+                fp = hashlib.sha1(nodes.encode('utf-8')).hexdigest()
+            self._fingerprints[dependency] = fp
+        return self._fingerprints[dependency]
+
+    def refresh(self):
+        ''' Forget the fingerprints seen so far, to pick up changed files '''
+        self._fingerprints = {}
+
+    def get(self, nodename, scope):
+        '''
+        Return the cached nodeinfo of a node and the (uri, dependency)
+        pairs it was built from, or None if there is no entry or it is out
+        of date.
+        '''
+        if not self._enabled:
+            return None
+        try:
+            with open(self._entry_path(nodename, scope), 'rb') as fp:
+                key, fingerprints, uris, nodeinfo = pickle.load(fp)
+        except Exception:
+            # missing or unreadable entries are just misses
+            return None
+        if key != self._key:
+            return None
+        try:
+            for dependency, fp in fingerprints:
+                if self._fingerprint(dependency) != fp:
+                    return None
+        except NotImplementedError:
+            self._enabled = False
+            return None
+        return nodeinfo, uris
+
+    def put(self, nodename, scope, nodeinfo, dependencies, uris=()):
+        '''
+        Store the nodeinfo of a node built from the given dependencies,
+        uris holds (uri, dependency) pairs of the ones loaded from storage.
+        '''
+        if not self._enabled:
+            return
+        try:
+            fingerprints = [ (d, self._fingerprint(d)) for d in sorted(set(dependencies)) ]
+        except NotImplementedError:
+            # the storage cannot tell when its data changes
+            self._enabled = False
+            return
+        fd, tmp = tempfile.mkstemp(dir=self._path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump((self._key, fingerprints, list(uris), nodeinfo), fp, pickle.HIGHEST_PROTOCOL)
+            # rename is atomic, so concurrent readers never see partial entries
+            os.rename(tmp, self._entry_path(nodename, scope))
+        except:
+            os.unlink(tmp)
+            raise
@@ -13,8 +13,12 @@ from __future__ import unicode_literals
 
 import sys, os, posix
 
-from reclass import get_storage, output
+from six import iteritems
+
+from reclass import get_storage, output, output_stream
 from reclass.core import Core
+from reclass.daemon import Client
+from reclass.profiler import Profiler
 from reclass.settings import Settings
 from reclass.config import find_and_read_configfile, get_options
 from reclass.defaults import *
@@ -26,26 +30,68 @@ def main():
     try:
         defaults = {'no_refs' : OPT_NO_REFS,
                     'pretty_print' : OPT_PRETTY_PRINT,
-                    'output' : OPT_OUTPUT
+                    'output' : OPT_OUTPUT,
+                    'stream' : OPT_STREAM
                    }
         defaults.update(find_and_read_configfile())
 
-        options = get_options(RECLASS_NAME, VERSION, DESCRIPTION, defaults=defaults)
-        storage = get_storage(options.storage_type,
-                              options.nodes_uri,
-                              options.classes_uri,
-                              options.compose_node_name)
-        class_mappings = defaults.get('class_mappings')
-        defaults.update(vars(options))
-        settings = Settings(defaults)
-        reclass = Core(storage, class_mappings, settings)
-
-        if options.mode == MODE_NODEINFO:
-            data = reclass.nodeinfo(options.nodename)
+        options = get_options(RECLASS_NAME, VERSION, DESCRIPTION, defaults=defaults,
+                              nodeinfo_help='output information for a specific node, '
+                                            'give it several times for more nodes',
+                              nodeinfo_multiple=True)
+        profiler = Profiler()
+        if options.profile or options.profile_file:
+            profiler.install()
+
+        def make_core():
+            storage = get_storage(options.storage_type,
+                                  options.nodes_uri,
+                                  options.classes_uri,
+                                  options.compose_node_name)
+            class_mappings = defaults.get('class_mappings')
+            defaults.update(vars(options))
+            settings = Settings(defaults)
+            return Core(storage, class_mappings, settings, workers=options.jobs,
+                        cache_dir=options.cache_dir)
+
+        if options.daemon_socket:
+            client = Client(options.daemon_socket, make_core, options.daemon_timeout)
+            nodeinfo = client.nodeinfo
+            nodeinfo_many = lambda names: dict((n, nodeinfo(n)) for n in names)
+            inventory = client.inventory
+            # the daemon answers with the whole inventory at once
+            iter_inventory = lambda: iteritems(inventory()['nodes'])
+        else:
+            reclass = make_core()
+            nodeinfo = reclass.nodeinfo
+            nodeinfo_many = reclass.nodeinfo_many
+            inventory = reclass.inventory
+            iter_inventory = reclass.iter_inventory
+
+        if options.mode == MODE_NODEINFO and len(options.nodenames) > 1:
+            # several nodes are printed as a mapping from their names
+            data = nodeinfo_many(options.nodenames)
+            with profiler.phase('output'):
+                print(output(data, options.output, options.pretty_print, options.no_refs))
+        elif options.mode == MODE_NODEINFO:
+            data = nodeinfo(options.nodename)
+            with profiler.phase('output'):
+                print(output(data, options.output, options.pretty_print, options.no_refs))
+        elif options.stream:
+            # nodes are rendered while the output is written, the time spent
+            # on writing is not measured separately
+            for chunk in output_stream(iter_inventory(), options.output, options.pretty_print, options.no_refs):
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
         else:
-            data = reclass.inventory()
+            data = inventory()
+            with profiler.phase('output'):
+                print(output(data, options.output, options.pretty_print, options.no_refs))
 
-        print(output(data, options.output, options.pretty_print, options.no_refs))
+        if options.profile:
+            sys.stderr.write(profiler.summary())
+        if options.profile_file:
+            profiler.write_json(options.profile_file)
 
     except ReclassException as e:
         e.exit_with_message(sys.stderr)
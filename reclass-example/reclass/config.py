@@ -57,6 +57,13 @@ def make_output_options_group(parser, defaults={}):
     ret.add_option('-r', '--no-refs', dest='no_refs', action="store_true",
                    default=defaults.get('no_refs', OPT_NO_REFS),
                    help='output all key values do not use yaml references [%default]')
+    ret.add_option('--stream', dest='stream', action="store_true",
+                   default=defaults.get('stream', OPT_STREAM),
+                   help='print the nodes of the inventory one by one as they are rendered, '
+                        'as JSON lines or YAML documents, leaving out the classes and '
+                        'applications lists. Rendered nodes are not kept, but the exports '
+                        'of all nodes are, so memory still grows with the inventory '
+                        '[%default]')
     ret.add_option('-1', '--single-error', dest='group_errors', action="store_false",
                    default=defaults.get('group_errors', OPT_GROUP_ERRORS),
                    help='throw errors immediately instead of grouping them together')
@@ -65,20 +72,59 @@ def make_output_options_group(parser, defaults={}):
     return ret
 
 
+def make_performance_options_group(parser, defaults={}):
+    ret = optparse.OptionGroup(parser, 'Performance options',
+                               'Configure how {0} uses the available resources'.format(parser.prog))
+    ret.add_option('-j', '--jobs', dest='jobs', type='int',
+                   default=defaults.get('jobs', OPT_JOBS),
+                   help='number of processes rendering nodes for the inventory [%default]')
+    ret.add_option('--cache-dir', dest='cache_dir',
+                   default=defaults.get('cache_dir', OPT_CACHE_DIR),
+                   help='keep rendered nodes in this directory to reuse them '
+                        'while their node and class files are unchanged')
+    ret.add_option('--daemon-socket', dest='daemon_socket',
+                   default=defaults.get('daemon_socket', OPT_DAEMON_SOCKET),
+                   help='get nodes from the {0}-daemon listening on this '
+                        'unix socket'.format(RECLASS_NAME))
+    ret.add_option('--daemon-timeout', dest='daemon_timeout', type='float',
+                   default=defaults.get('daemon_timeout', OPT_DAEMON_TIMEOUT),
+                   help='seconds to wait for the {0}-daemon before rendering '
+                        'without it, 0 waits forever [%default]'.format(RECLASS_NAME))
+    ret.add_option('--profile', dest='profile', action='store_true',
+                   default=defaults.get('profile', OPT_PROFILE),
+                   help='print the time spent in each phase to stderr, '
+                        'workers started for -j are not measured [%default]')
+    ret.add_option('--profile-file', dest='profile_file',
+                   default=defaults.get('profile_file', OPT_PROFILE_FILE),
+                   help='write the time spent in each phase, in total and per '
+                        'node, as JSON to this file')
+    return ret
+
+
 def make_modes_options_group(parser, inventory_shortopt, inventory_longopt,
                              inventory_help, nodeinfo_shortopt,
-                             nodeinfo_longopt, nodeinfo_dest, nodeinfo_help):
+                             nodeinfo_longopt, nodeinfo_dest, nodeinfo_help,
+                             nodeinfo_multiple=False):
 
     def _mode_checker_cb(option, opt_str, value, parser):
+        is_nodeinfo = option == parser.get_option(nodeinfo_longopt)
         if hasattr(parser.values, 'mode'):
-            raise optparse.OptionValueError('Cannot specify multiple modes')
-
-        if option == parser.get_option(nodeinfo_longopt):
+            if not (nodeinfo_multiple and is_nodeinfo and
+                    parser.values.mode == MODE_NODEINFO):
+                raise optparse.OptionValueError('Cannot specify multiple modes')
+            # the first node stays in nodeinfo_dest, all of them are
+            # collected in nodeinfo_dest + 's'
+            getattr(parser.values, nodeinfo_dest + 's').append(value)
+            return
+
+        if is_nodeinfo:
             setattr(parser.values, 'mode', MODE_NODEINFO)
             setattr(parser.values, nodeinfo_dest, value)
+            setattr(parser.values, nodeinfo_dest + 's', [value])
         else:
             setattr(parser.values, 'mode', MODE_INVENTORY)
             setattr(parser.values, nodeinfo_dest, None)
+            setattr(parser.values, nodeinfo_dest + 's', [])
 
     ret = optparse.OptionGroup(parser, 'Modes',
                                'Specify one of these to determine what to do.')
@@ -101,7 +147,8 @@ def make_parser_and_checker(name, version, description,
                             nodeinfo_dest='nodename',
                             nodeinfo_help='output information for a specific node',
                             add_options_cb=None,
-                            defaults={}):
+                            defaults={},
+                            nodeinfo_multiple=False):
 
     parser = optparse.OptionParser(version=version)
     parser.prog = name
@@ -118,6 +165,9 @@ def make_parser_and_checker(name, version, description,
     output_group = make_output_options_group(parser, defaults)
     parser.add_option_group(output_group)
 
+    performance_group = make_performance_options_group(parser, defaults)
+    parser.add_option_group(performance_group)
+
     if callable(add_options_cb):
         add_options_cb(parser, defaults)
 
@@ -125,7 +175,7 @@ def make_parser_and_checker(name, version, description,
                                            inventory_longopt, inventory_help,
                                            nodeinfo_shortopt,
                                            nodeinfo_longopt, nodeinfo_dest,
-                                           nodeinfo_help)
+                                           nodeinfo_help, nodeinfo_multiple)
     parser.add_option_group(modes_group)
 
     def option_checker(options, args):
@@ -157,7 +207,8 @@ def get_options(name, version, description,
                             nodeinfo_dest='nodename',
                             nodeinfo_help='output information for a specific node',
                             add_options_cb=None,
-                            defaults={}):
+                            defaults={},
+                            nodeinfo_multiple=False):
 
     parser, checker = make_parser_and_checker(name, version, description,
                                               inventory_shortopt,
@@ -167,7 +218,8 @@ def get_options(name, version, description,
                                               nodeinfo_longopt, nodeinfo_dest,
                                               nodeinfo_help,
                                               add_options_cb,
-                                              defaults=defaults)
+                                              defaults=defaults,
+                                              nodeinfo_multiple=nodeinfo_multiple)
     options, args = parser.parse_args()
     checker(options, args)
 
@@ -15,6 +15,8 @@ import copy
 import time
 import re
 import fnmatch
+import multiprocessing
+import os
 import shlex
 import string
 import sys
@@ -22,21 +24,67 @@ import yaml
 
 from six import iteritems
 
+from reclass.cache import NodeCache
 from reclass.settings import Settings
 from reclass.datatypes import Entity, Classes, Parameters, Exports
-from reclass.errors import MappingFormatError, ClassNameResolveError, ClassNotFound, InvQueryClassNameResolveError, InvQueryClassNotFound, InvQueryError, InterpolationError, ResolveError
+from reclass.errors import MappingFormatError, ClassNameResolveError, ClassNotFound, InvQueryClassNameResolveError, InvQueryClassNotFound, InvQueryError, InterpolationError, ResolveError, ReclassException
+from reclass.utils.inventory import Inventory
 from reclass.values.parser import Parser
 
 
+# state handed to forked inventory workers, see Core._inventory_parallel
+_worker_state = None
+
+def _nodeinfo_worker(nodenames):
+    core, inventory, entities = _worker_state
+    results = []
+    for nodename in nodenames:
+        try:
+            nodeinfo, dependencies = core._render_node(nodename, inventory, entities.get(nodename))
+            results.append((nodename, nodeinfo, dependencies))
+        except Exception:
+            # exceptions do not survive pickling reliably, so the parent
+            # renders failed nodes again to raise the real error
+            results.append((nodename, None, None))
+    return results
+
+
 class Core(object):
 
     _parser = Parser()
 
-    def __init__(self, storage, class_mappings, settings, input_data=None):
+    def __init__(self, storage, class_mappings, settings, input_data=None, workers=1, cache_dir=None):
         self._storage = storage
         self._class_mappings = class_mappings
         self._settings = settings
         self._input_data = input_data
+        self._workers = workers or 1
+        self._compile_class_mappings()
+        # merged class hierarchies shared by many nodes, see _class_descent
+        self._class_closures = {}
+        self._descent_cache = {}
+        self._node_templates = {}
+        # environment and classes every merged node was built from, and
+        # classes that were skipped as missing
+        self._node_classes = {}
+        self._missing_classes = set()
+        # nodes with inventory queries, these are gone after interpolation
+        self._query_nodes = set()
+        self._node_queries = {}
+        # what was loaded from every storage uri, the uri every node and
+        # class came from and the state of the last inventory run, see
+        # update_inventory
+        self._uris = {}
+        self._dependency_uris = {}
+        self._exports = None
+        self._rendered = {}
+        # merged nodes and exports inventories shared by nodeinfo calls,
+        # see _get_inventory
+        self._inventory_nodes = {}
+        self._exports_inventories = {}
+        self._cache = None
+        if cache_dir:
+            self._cache = NodeCache(cache_dir, storage, settings, class_mappings, input_data)
         if self._settings.ignore_class_notfound:
             self._cnf_r = re.compile(
                 '|'.join(self._settings.ignore_class_notfound_regexp))
@@ -45,14 +93,6 @@ class Core(object):
     def _get_timestamp():
         return time.strftime('%c')
 
-    @staticmethod
-    def _match_regexp(key, nodename):
-        return re.search(key, nodename)
-
-    @staticmethod
-    def _match_glob(key, nodename):
-        return fnmatch.fnmatchcase(nodename, key)
-
     @staticmethod
     def _shlex_split(instr):
         lexer = shlex.shlex(instr, posix=True)
@@ -72,23 +112,40 @@ class Core(object):
             key = '/{0}/'.format(key)
         return key, list(lexer)
 
+    def _compile_class_mappings(self):
+        # (pattern, is regexp, classes) for every mapping, and one pattern
+        # matching if any of the globs does, so that nodes not matched by
+        # any glob skip them all at once
+        self._mappings = []
+        globs = []
+        for mapping in self._class_mappings or []:
+            key, klasses = Core._shlex_split(mapping)
+            if key[0] == ('/'):
+                self._mappings.append((re.compile(key[1:-1]), True, klasses))
+            else:
+                # same as fnmatch.fnmatchcase
+                pattern = fnmatch.translate(key)
+                globs.append('(?:{0})'.format(pattern))
+                self._mappings.append((re.compile(pattern), False, klasses))
+        self._any_glob = None
+        if globs:
+            self._any_glob = re.compile('|'.join(globs))
+
     def _get_class_mappings_entity(self, nodename):
         if not self._class_mappings:
             return Entity(self._settings, name='empty (class mappings)')
         c = Classes()
-        for mapping in self._class_mappings:
-            matched = False
-            key, klasses = Core._shlex_split(mapping)
-            if key[0] == ('/'):
-                matched = Core._match_regexp(key[1:-1], nodename)
+        glob_matched = self._any_glob is not None and self._any_glob.match(nodename)
+        for (pattern, regexp, klasses) in self._mappings:
+            if regexp:
+                matched = pattern.search(nodename)
                 if matched:
                     for klass in klasses:
                         c.append_if_new(matched.expand(klass))
 
-            else:
-                if Core._match_glob(key, nodename):
-                    for klass in klasses:
-                        c.append_if_new(klass)
+            elif glob_matched and pattern.match(nodename):
+                for klass in klasses:
+                    c.append_if_new(klass)
 
         return Entity(self._settings, classes=c,
                       name='class mappings for node {0}'.format(nodename))
@@ -112,6 +169,15 @@ class Core(object):
         if context is None:
             context = Entity(self._settings, name='empty (@{0})'.format(nodename))
 
+        self._merge_classes(entity, merge_base, context, seen, nodename, environment)
+
+        # … and finally, we merge what we have at this level into the
+        # result of the iteration, so that elements at the current level
+        # overwrite stuff defined by parents
+        merge_base.merge(entity)
+        return merge_base
+
+    def _merge_classes(self, entity, merge_base, context, seen, nodename, environment):
         for klass in entity.classes.as_list():
             # class name contain reference
             num_references = klass.count(self._settings.reference_sentinels[0]) +\
@@ -128,9 +194,11 @@ class Core(object):
             if klass not in seen:
                 try:
                     class_entity = self._storage.get_class(klass, environment, self._settings)
+                    self._record_uri(class_entity.uri, ('class', klass, environment))
                 except ClassNotFound as e:
                     if self._settings.ignore_class_notfound:
                         if self._cnf_r.match(klass):
+                            self._missing_classes.add((klass, environment))
                             if self._settings.ignore_class_notfound_warning:
                                 # TODO, add logging handler
                                 print("[WARNING] Reclass class not found: '%s'. Skipped!" % klass, file=sys.stderr)
@@ -139,18 +207,74 @@ class Core(object):
                     e.uri = entity.uri
                     raise
 
-                descent = self._recurse_entity(class_entity, context=context, seen=seen,
-                                               nodename=nodename, environment=environment)
+                descent = self._class_descent(klass, class_entity, context, seen,
+                                              nodename, environment)
                 # on every iteration, we merge the result of the recursive
                 # descent into what we have so far…
                 merge_base.merge(descent)
                 seen[klass] = True
 
-        # … and finally, we merge what we have at this level into the
-        # result of the iteration, so that elements at the current level
-        # overwrite stuff defined by parents
-        merge_base.merge(entity)
-        return merge_base
+    def _record_queries(self, nodename, node):
+        # only valid after initialising the interpolation of the node
+        if node.parameters.has_inv_query:
+            self._query_nodes.add(nodename)
+        else:
+            self._query_nodes.discard(nodename)
+
+    def _record_uri(self, uri, dependency):
+        self._uris.setdefault(uri, set()).add(dependency)
+        self._dependency_uris[dependency] = uri
+
+    def _class_closure(self, klass, environment):
+        # names of all classes below klass, or None if the hierarchy cannot
+        # be known without a node (class names containing references,
+        # missing classes or cycles)
+        key = (klass, environment)
+        if key in self._class_closures:
+            return self._class_closures[key]
+        # mark as unknown while descending so that cycles end here
+        self._class_closures[key] = None
+        try:
+            class_entity = self._storage.get_class(klass, environment, self._settings)
+            self._record_uri(class_entity.uri, ('class', klass, environment))
+        except ClassNotFound:
+            return None
+        closure = set()
+        for name in class_entity.classes.as_list():
+            if (self._settings.reference_sentinels[0] in name or
+                    self._settings.export_sentinels[0] in name):
+                return None
+            below = self._class_closure(name, environment)
+            if below is None:
+                return None
+            closure.add(name)
+            closure.update(below)
+        closure = frozenset(closure)
+        self._class_closures[key] = closure
+        return closure
+
+    def _class_descent(self, klass, class_entity, context, seen, nodename, environment):
+        # The merged hierarchy below a class only depends on which of its
+        # ancestors were merged already, so it is computed once for every
+        # such state and shared by all nodes. Merging copies the containers
+        # of the shared entity, so the cached entity itself is never changed.
+        closure = self._class_closure(klass, environment)
+        if closure is None:
+            return self._recurse_entity(class_entity, context=context, seen=seen,
+                                        nodename=nodename, environment=environment)
+        key = (klass, environment, closure.intersection(seen))
+        try:
+            descent, added = self._descent_cache[key]
+        except KeyError:
+            before = set(seen)
+            descent = self._recurse_entity(class_entity, context=context, seen=seen,
+                                           nodename=nodename, environment=environment)
+            added = [ k for k in seen if k not in before ]
+            self._descent_cache[key] = (descent, added)
+        else:
+            for k in added:
+                seen[k] = True
+        return descent
 
     def _get_automatic_parameters(self, nodename, environment):
         if self._settings.automatic_parameters:
@@ -167,9 +291,45 @@ class Core(object):
         else:
             return Parameters({}, self._settings, '')
 
-    def _get_inventory(self, all_envs, environment, queries):
-        inventory = {}
-        for nodename in self._storage.enumerate_nodes():
+    @staticmethod
+    def _queries_key(queries):
+        # the exports rendered for queries only depend on the paths they
+        # reference and on whether failures are ignored
+        if queries is None:
+            return None
+        key = []
+        for (p, q) in queries:
+            ignore = q.ignore_failed_render
+            if callable(ignore):
+                # a method of Value but an attribute of ValueList
+                ignore = ignore()
+            key.append((tuple(str(r) for r in q.get_inv_references()), ignore))
+        return tuple(key)
+
+    def _inventory_queries(self):
+        queries = {}
+        for node_queries in self._node_queries.values():
+            for query in node_queries:
+                queries.setdefault(self._queries_key([query])[0], query)
+        # queries not ignoring failed renders go first, so that a failing
+        # export is reported instead of silently dropped
+        return sorted(queries.values(), key=lambda query: self._queries_key([query])[0][1])
+
+    def _get_inventory(self, all_envs, environment, queries, entities=None, nodenames=None):
+        # Inventories built for nodeinfo calls are kept until invalidate(),
+        # as are the merged nodes they are built from. Inventory runs keep
+        # their merged nodes in entities for rendering them in place.
+        key = None
+        if entities is None and nodenames is None:
+            key = (all_envs, None if all_envs else environment, self._queries_key(queries))
+            if key in self._exports_inventories:
+                return self._exports_inventories[key]
+
+        inventory = Inventory()
+        selected = []
+        if nodenames is None:
+            nodenames = self._storage.enumerate_nodes()
+        for nodename in nodenames:
             try:
                 node_base = self._storage.get_node(nodename, self._settings)
                 if node_base.environment is None:
@@ -180,46 +340,103 @@ class Core(object):
                 raise
 
             if all_envs or node_base.environment == environment:
-                try:
-                    node = self._node_entity(nodename)
-                except ClassNotFound as e:
-                    raise InvQueryClassNotFound(e)
-                except ClassNameResolveError as e:
-                    raise InvQueryClassNameResolveError(e)
-                if queries is None:
+                node = self._inventory_nodes.get(nodename) if entities is None else None
+                if node is None:
                     try:
-                        node.interpolate_exports()
-                    except InterpolationError as e:
-                        e.nodename = nodename
-                else:
-                    node.initialise_interpolation()
-                    for p, q in queries:
-                        try:
-                            node.interpolate_single_export(q)
-                        except InterpolationError as e:
-                            e.nodename = nodename
-                            raise InvQueryError(q.contents, e, context=p, uri=q.uri)
-                inventory[nodename] = node.exports.as_dict()
+                        node = self._node_entity(nodename)
+                    except ClassNotFound as e:
+                        raise InvQueryClassNotFound(e)
+                    except ClassNameResolveError as e:
+                        raise InvQueryClassNameResolveError(e)
+                    if entities is None:
+                        self._inventory_nodes[nodename] = node
+                    else:
+                        entities[nodename] = node
+                # interpolate the exports on a copy to leave the merged
+                # node untouched
+                node = copy.copy(node)
+                node.initialise_interpolation()
+                if queries is None:
+                    # also done here as nodes may be rendered in workers
+                    self._record_queries(nodename, node)
+                    self._node_queries[nodename] = node.parameters.get_inv_queries()
+                selected.append((nodename, node))
+
+        if queries is None:
+            # only the exports read by some query of the inventory are needed
+            queries = self._inventory_queries()
+        for (nodename, node) in selected:
+            for p, q in queries:
+                try:
+                    node.interpolate_single_export(q)
+                except InterpolationError as e:
+                    e.nodename = nodename
+                    raise InvQueryError(q.contents, e, context=p, uri=q.uri)
+            node.exports.drop_unrendered()
+            inventory[nodename] = node.exports.as_dict()
+        if key is not None:
+            self._exports_inventories[key] = inventory
         return inventory
 
+    def _node_template_key(self, base_entity, node_entity):
+        environment = node_entity.environment
+        mapped = tuple(base_entity.classes.as_list())
+        declared = tuple(node_entity.classes.as_list())
+        for klass in mapped + declared:
+            if (self._settings.reference_sentinels[0] in klass or
+                    self._settings.export_sentinels[0] in klass):
+                return None
+            if self._class_closure(klass, environment) is None:
+                return None
+        return (environment, mapped, declared)
+
     def _node_entity(self, nodename):
         node_entity = self._storage.get_node(nodename, self._settings)
+        self._record_uri(node_entity.uri, ('node', nodename, None))
         if node_entity.environment == None:
             node_entity.environment = self._settings.default_environment
         base_entity = Entity(self._settings, name='base')
         base_entity.merge(self._get_class_mappings_entity(node_entity.name))
         base_entity.merge(self._get_input_data_entity())
-        base_entity.merge_parameters(self._get_automatic_parameters(nodename, node_entity.environment))
-        seen = {}
-        merge_base = self._recurse_entity(base_entity, seen=seen, nodename=nodename,
-                                          environment=node_entity.environment)
-        return self._recurse_entity(node_entity, merge_base=merge_base, context=merge_base, seen=seen,
-                                    nodename=nodename, environment=node_entity.environment)
-
-    def _nodeinfo(self, nodename, inventory):
+        automatic_parameters = self._get_automatic_parameters(nodename, node_entity.environment)
+        base_entity.merge_parameters(automatic_parameters)
+
+        # Nodes with the same environment and class lists only differ in
+        # their automatic parameters and in the node entity itself. So the
+        # class stack is merged once into a template, which is cloned for
+        # every such node before its own data is put in place.
+        key = self._node_template_key(base_entity, node_entity)
+        template = self._node_templates.get(key) if key is not None else False
+        if template is None or template is False:
+            seen = {}
+            merge_base = self._recurse_entity(base_entity, seen=seen, nodename=nodename,
+                                              environment=node_entity.environment)
+            self._merge_classes(node_entity, merge_base, merge_base, seen,
+                                nodename, node_entity.environment)
+            classes = tuple(seen)
+            if template is None and merge_base.parameters.holds_unmerged(automatic_parameters):
+                template = self._node_templates[key] = (merge_base, classes)
+            else:
+                if key is not None:
+                    # some class changed the automatic parameters
+                    self._node_templates[key] = False
+                self._node_classes[nodename] = (node_entity.environment, classes)
+                merge_base.merge(node_entity)
+                return merge_base
+
+        template, classes = template
+        self._node_classes[nodename] = (node_entity.environment, classes)
+        node = template.clone()
+        node.parameters.replace_unmerged(automatic_parameters)
+        node.merge(node_entity)
+        return node
+
+    def _nodeinfo(self, nodename, inventory, node=None):
         try:
-            node = self._node_entity(nodename)
+            if node is None:
+                node = self._node_entity(nodename)
             node.initialise_interpolation()
+            self._record_queries(nodename, node)
             if node.parameters.has_inv_query and inventory is None:
                 inventory = self._get_inventory(node.parameters.needs_all_envs, node.environment, node.parameters.get_inv_queries())
             node.interpolate(inventory)
@@ -239,23 +456,155 @@ class Core(object):
         ret.update(entity.as_dict())
         return ret
 
-    def nodeinfo(self, nodename):
-        return self._nodeinfo_as_dict(nodename, self._nodeinfo(nodename, None))
+    def _node_dependencies(self, nodename):
+        environment, classes = self._node_classes[nodename]
+        deps = [ ('node', nodename, None) ]
+        deps.extend(('class', c, environment) for c in classes)
+        deps.extend(('class', c, e) for (c, e) in self._missing_classes if e == environment)
+        if nodename in self._query_nodes:
+            # the exports of every other node may end up in this one
+            deps.append(('nodes', None, None))
+            for n in self._storage.enumerate_nodes():
+                deps.append(('node', n, None))
+                if n in self._node_classes:
+                    env, classes = self._node_classes[n]
+                    deps.extend(('class', c, env) for c in classes)
+        return deps
+
+    def _render_node(self, nodename, inventory, node=None):
+        node = self._nodeinfo(nodename, inventory, node)
+        deps = None
+        if self._cache is not None:
+            deps = self._node_dependencies(nodename)
+        return self._nodeinfo_as_dict(nodename, node), deps
+
+    def _cached_nodeinfo(self, nodename, scope):
+        entry = self._cache.get(nodename, scope)
+        if entry is None:
+            return None
+        nodeinfo, uris = entry
+        # nothing is loaded for a cached node, so the uris it was built
+        # from are taken from its entry for loaded_uris()
+        for (uri, dependency) in uris:
+            self._record_uri(uri, dependency)
+        nodeinfo['__reclass__']['timestamp'] = Core._get_timestamp()
+        return nodeinfo
+
+    def _cache_put(self, nodename, scope, nodeinfo, deps):
+        uris = [ (self._dependency_uris[d], d) for d in set(deps) if d in self._dependency_uris ]
+        self._cache.put(nodename, scope, nodeinfo, deps, uris)
 
-    def inventory(self):
-        query_nodes = set()
+    def nodeinfo(self, nodename):
+        if self._cache is None:
+            return self._nodeinfo_as_dict(nodename, self._nodeinfo(nodename, None))
+        self._cache.refresh()
+        nodeinfo = self._cached_nodeinfo(nodename, 'nodeinfo')
+        if nodeinfo is None:
+            nodeinfo, deps = self._render_node(nodename, None)
+            self._cache_put(nodename, 'nodeinfo', nodeinfo, deps)
+        return nodeinfo
+
+    def _nodeinfo_parallel(self, nodenames):
+        # The nodes are merged and the exports inventories they query are
+        # built here first, the workers inherit both instead of each of them
+        # building its own copy.
         entities = {}
-        inventory = self._get_inventory(True, '', None)
-        for n in self._storage.enumerate_nodes():
-            entities[n] = self._nodeinfo(n, inventory)
-        for n in query_nodes:
-            entities[n] = self._nodeinfo(n, inventory)
+        for n in nodenames:
+            try:
+                node = self._node_entity(n)
+                probe = copy.copy(node)
+                probe.initialise_interpolation()
+                if probe.parameters.has_inv_query:
+                    self._get_inventory(probe.parameters.needs_all_envs, node.environment,
+                                        probe.parameters.get_inv_queries())
+            except ReclassException:
+                # raised again with the proper context when the node fails
+                # to render
+                continue
+            entities[n] = node
+        return self._render_parallel(nodenames, None, entities)
+
+    def nodeinfo_many(self, nodenames):
+        # Returns {nodename: nodeinfo} for the given nodes, like calling
+        # nodeinfo() for each of them but rendering them in parallel when
+        # there are several workers.
+        nodeinfos = {}
+        missing = []
+        seen = set()
+        if self._cache is not None:
+            self._cache.refresh()
+        for n in nodenames:
+            if n in seen:
+                continue
+            seen.add(n)
+            nodeinfo = self._cached_nodeinfo(n, 'nodeinfo') if self._cache is not None else None
+            if nodeinfo is None:
+                missing.append(n)
+            else:
+                nodeinfos[n] = nodeinfo
 
+        if self._workers > 1 and len(missing) > 1:
+            results = self._nodeinfo_parallel(missing)
+        else:
+            results = ( (n,) + self._render_node(n, None) for n in missing )
+        for (n, nodeinfo, deps) in results:
+            nodeinfos[n] = nodeinfo
+            if self._cache is not None:
+                self._cache_put(n, 'nodeinfo', nodeinfo, deps)
+        return nodeinfos
+
+    def _render_parallel(self, nodenames, inventory, entities):
+        global _worker_state
+        try:
+            context = multiprocessing.get_context('fork')
+        except (AttributeError, ValueError):
+            # no fork on this platform, workers would have to reload the
+            # whole storage so just render serially
+            context = None
+        if context is None:
+            for n in nodenames:
+                yield (n,) + self._render_node(n, inventory, entities.pop(n, None))
+            return
+
+        # several chunks per worker to even out nodes of differing cost,
+        # Pool.imap returns them in order so the result stays deterministic
+        chunksize = max(1, -(-len(nodenames) // (self._workers * 4)))
+        chunks = [ nodenames[i:i+chunksize] for i in range(0, len(nodenames), chunksize) ]
+        _worker_state = (self, inventory, entities)
+        pool = context.Pool(processes=self._workers)
+        try:
+            for chunk in pool.imap(_nodeinfo_worker, chunks):
+                for (n, nodeinfo, deps) in chunk:
+                    node = entities.pop(n, None)
+                    if nodeinfo is None:
+                        nodeinfo, deps = self._render_node(n, inventory, node)
+                    yield (n, nodeinfo, deps)
+        finally:
+            # also stops the workers if the caller gives up early
+            pool.terminate()
+            pool.join()
+            _worker_state = None
+
+    def _iter_rendered(self, nodenames, inventory, entities):
+        if self._workers > 1:
+            results = self._render_parallel(nodenames, inventory, entities)
+        else:
+            results = ( (n,) + self._render_node(n, inventory, entities.pop(n, None)) for n in nodenames )
+        for (n, nodeinfo, deps) in results:
+            if self._cache is not None:
+                self._cache_put(n, 'inventory', nodeinfo, deps)
+            yield (n, nodeinfo)
+
+    def _render_nodes(self, nodenames, inventory, entities):
+        return dict(self._iter_rendered(nodenames, inventory, entities))
+
+    def _inventory_as_dict(self, nodenames, rendered):
         nodes = {}
         applications = {}
         classes = {}
-        for (f, nodeinfo) in iteritems(entities):
-            d = nodes[f] = self._nodeinfo_as_dict(f, nodeinfo)
+        for f in nodenames:
+            d = rendered[f]
+            nodes[f] = d
             for a in d['applications']:
                 if a in applications:
                     applications[a].append(f)
@@ -272,3 +621,140 @@ class Core(object):
                 'classes': classes,
                 'applications': applications
                }
+
+    def _cached_nodeinfos(self, nodenames):
+        # {nodename: nodeinfo} of the nodes with a valid inventory entry,
+        # every entry is read once as it may change between two reads
+        cached = {}
+        if self._cache is None:
+            return cached
+        self._cache.refresh()
+        for n in nodenames:
+            nodeinfo = self._cached_nodeinfo(n, 'inventory')
+            if nodeinfo is not None:
+                cached[n] = nodeinfo
+        return cached
+
+    def iter_inventory(self):
+        # Yields (nodename, nodeinfo) for all nodes in the order of
+        # inventory(), but renders them one at a time and keeps none of them
+        # around. The merged nodes are dropped once the exports are built
+        # and each node is merged again when it is rendered, which the
+        # merged class stacks make cheap. So the exports of all nodes stay
+        # in memory, which grows linearly with the inventory, as does the
+        # peak while the exports are built. Nodes found in the cache are
+        # read up front and held until they are yielded.
+        nodenames = list(self._storage.enumerate_nodes())
+        cached = self._cached_nodeinfos(nodenames)
+        rendered = iter(())
+        if len(cached) < len(nodenames):
+            inventory = self._get_inventory(True, '', None, {})
+            missing = [ n for n in nodenames if n not in cached ]
+            rendered = self._iter_rendered(missing, inventory, {})
+        # nothing is kept for update_inventory() to start from
+        self._exports = None
+        self._rendered = {}
+        for n in nodenames:
+            if n in cached:
+                yield (n, cached.pop(n))
+            else:
+                yield next(rendered)
+
+    def inventory(self):
+        nodenames = list(self._storage.enumerate_nodes())
+        rendered = self._cached_nodeinfos(nodenames)
+
+        self._exports = None
+        if len(rendered) < len(nodenames):
+            # the exports of all nodes are needed even if only some of them
+            # have to be rendered again
+            merged = {}
+            self._exports = self._get_inventory(True, '', None, merged)
+            missing = [ n for n in nodenames if n not in rendered ]
+            rendered.update(self._render_nodes(missing, self._exports, merged))
+        self._rendered = rendered
+        return self._inventory_as_dict(nodenames, rendered)
+
+    def _changed_entities(self, changed):
+        # map changed files (or storage uris) to the nodes and classes that
+        # were loaded from them, None if any of them is unknown
+        known = {}
+        for (uri, loaded) in iteritems(self._uris):
+            known[uri] = loaded
+            known[uri.split('://', 1)[-1]] = loaded
+        nodes = set()
+        classes = set()
+        for f in changed:
+            loaded = known.get(f) or known.get(os.path.abspath(f))
+            if loaded is None:
+                return None, None
+            for (kind, name, environment) in loaded:
+                if kind == 'node':
+                    nodes.add(name)
+                else:
+                    classes.add((name, environment))
+        return nodes, classes
+
+    def _forget_merged(self):
+        self._class_closures = {}
+        self._descent_cache = {}
+        self._node_templates = {}
+        self._inventory_nodes = {}
+        self._exports_inventories = {}
+
+    def loaded_uris(self):
+        return list(self._uris)
+
+    def invalidate(self, changed):
+        # Forget everything loaded from the given files, so that they are
+        # read again the next time they are needed. Returns False if some
+        # file was not loaded before, everything is forgotten then.
+        nodes, classes = self._changed_entities(changed)
+        self._forget_merged()
+        if nodes is None:
+            self._storage.invalidate()
+            self._exports = None
+            return False
+        self._storage.invalidate(nodes, classes)
+        return True
+
+    def update_inventory(self, changed):
+        # Render the inventory again after the given node and class files
+        # changed, reusing the result of the previous inventory() or
+        # update_inventory() call for all nodes not depending on them. Nodes
+        # with inventory queries are rendered again if the exports of any
+        # node changed. Files that were not loaded before, like new nodes or
+        # classes, need a full run, as do added or removed node files which
+        # the storage only picks up when it is created.
+        nodes, classes = self._changed_entities(changed)
+        if self._exports is None or nodes is None:
+            self._forget_merged()
+            self._storage.invalidate()
+            return self.inventory()
+
+        self._storage.invalidate(nodes, classes)
+        self._forget_merged()
+        if self._cache is not None:
+            self._cache.refresh()
+
+        nodenames = list(self._storage.enumerate_nodes())
+        affected = set(nodes)
+        for n in nodenames:
+            environment, deps = self._node_classes.get(n, (None, ()))
+            if any((c, environment) in classes for c in deps):
+                affected.add(n)
+
+        merged = {}
+        queries = self._queries_key(self._inventory_queries())
+        exports = self._get_inventory(True, '', None, merged,
+                                      [ n for n in nodenames if n in affected ])
+        if self._queries_key(self._inventory_queries()) != queries:
+            # other nodes may lack exports read by the changed queries
+            exports = self._get_inventory(True, '', None, merged, nodenames)
+        if any(self._exports.get(n) != e for (n, e) in iteritems(exports)):
+            affected.update(self._query_nodes)
+        self._exports.update(exports)
+
+        affected = [ n for n in nodenames if n in affected ]
+        self._rendered.update(self._render_nodes(affected, self._exports, merged))
+        return self._inventory_as_dict(nodenames, self._rendered)
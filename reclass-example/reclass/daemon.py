@@ -0,0 +1,291 @@
+#
+# -*- coding: utf-8 -*-
+#
+# This file is part of reclass (http://github.com/madduck/reclass)
+#
+# Released under the terms of the Artistic Licence 2.0
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import errno
+import json
+import optparse
+import os
+import posix
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from six import iteritems
+from six.moves import socketserver
+
+from reclass import get_storage, get_path_mangler
+from reclass.core import Core
+from reclass.settings import Settings
+from reclass.config import find_and_read_configfile, make_db_options_group, make_performance_options_group
+from reclass.defaults import *
+from reclass.errors import ReclassException, DaemonError, DaemonTimeoutError
+from reclass.version import *
+
+URI_PREFIX = 'yaml_fs://'
+
+# seconds by which file modification times may lag behind the clock, as
+# file systems keep them with limited precision
+MTIME_RESOLUTION = 2.0
+
+# stands in for the modification time of files which may have changed
+# after they were read, it differs from every real one
+_UNSETTLED = object()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class Daemon(object):
+    '''
+    Answers requests for nodes and the inventory from a long-lived Core.
+
+    Before every request the modification times of all files read so far
+    are compared to the ones seen when they were loaded, and Core forgets
+    what came from changed files. Adding or removing files changes the
+    modification time of the watched directories, which makes the daemon
+    start over with a new storage and Core.
+    '''
+
+    def __init__(self, make_core, watch_dirs=()):
+        self._make_core = make_core
+        self._watch_dirs = watch_dirs
+        self._reset()
+
+    def _reset(self):
+        self._core = self._make_core()
+        self._dirs = self._dir_mtimes()
+        self._files = {}
+        self._nodes = {}
+        self._inventory = None
+        self._changed = set()
+
+    def _dir_mtimes(self):
+        mtimes = {}
+        for top in self._watch_dirs:
+            for (dirpath, dirnames, filenames) in os.walk(top, followlinks=True):
+                mtimes[dirpath] = _mtime(dirpath)
+        return mtimes
+
+    def _watch_loaded(self, started):
+        # The modification times are taken after the files were read, an
+        # edit in between would go unnoticed. So files modified since
+        # shortly before the request started count as changed on the next
+        # one and are read again then.
+        for uri in self._core.loaded_uris():
+            if uri.startswith(URI_PREFIX):
+                path = uri[len(URI_PREFIX):]
+                if path not in self._files:
+                    mtime = _mtime(path)
+                    if mtime is not None and mtime >= started - MTIME_RESOLUTION:
+                        mtime = _UNSETTLED
+                    self._files[path] = mtime
+
+    def _refresh(self):
+        if self._dir_mtimes() != self._dirs:
+            self._reset()
+            return
+        changed = [ path for (path, mtime) in iteritems(self._files) if _mtime(path) != mtime ]
+        if len(changed) == 0:
+            return
+        for path in changed:
+            del self._files[path]
+        self._nodes = {}
+        if not self._core.invalidate(changed):
+            self._reset()
+            return
+        if self._inventory is not None:
+            # rendered again on the next inventory request
+            self._changed.update(changed)
+            self._inventory = None
+
+    def nodeinfo(self, nodename):
+        self._refresh()
+        if nodename not in self._nodes:
+            started = time.time()
+            self._nodes[nodename] = self._core.nodeinfo(nodename)
+            self._watch_loaded(started)
+        nodeinfo = self._nodes[nodename]
+        nodeinfo['__reclass__']['timestamp'] = Core._get_timestamp()
+        return nodeinfo
+
+    def inventory(self):
+        self._refresh()
+        if self._inventory is None:
+            started = time.time()
+            if self._changed:
+                self._inventory = self._core.update_inventory(list(self._changed))
+            else:
+                self._inventory = self._core.inventory()
+            self._changed = set()
+            self._watch_loaded(started)
+        self._inventory['__reclass__']['timestamp'] = Core._get_timestamp()
+        return self._inventory
+
+    def handle(self, request):
+        if request.get('mode') == 'nodeinfo':
+            return self.nodeinfo(request['nodename'])
+        elif request.get('mode') == 'inventory':
+            return self.inventory()
+        raise DaemonError('Unknown request: {0}'.format(request), rc=posix.EX_USAGE)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            response = {'result': self.server.daemon.handle(request)}
+        except ReclassException as e:
+            response = {'error': e.message, 'rc': e.rc}
+        except Exception:
+            response = {'error': traceback.format_exc(), 'rc': posix.EX_SOFTWARE}
+        # values json cannot represent, like dates, are sent as strings
+        response = json.dumps(response, default=str) + '\n'
+        self.wfile.write(response.encode('utf-8'))
+
+
+def serve(daemon, path):
+    try:
+        os.unlink(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+    # the socket is created with the umask, set so that only the owner can
+    # connect from the moment it exists
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(path, _RequestHandler)
+    finally:
+        os.umask(umask)
+    server.daemon = daemon
+    # leave through the finally clause below to remove the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(posix.EX_OK))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+def query(path, mode, nodename=None, timeout=OPT_DAEMON_TIMEOUT):
+    '''
+    Ask the daemon listening on the unix socket path for data, waiting at
+    most timeout seconds for every step, or forever if it is 0 or None
+    '''
+    request = json.dumps({'mode': mode, 'nodename': nodename}) + '\n'
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout or None)
+    try:
+        sock.connect(path)
+        sock.sendall(request.encode('utf-8'))
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except socket.timeout:
+        raise DaemonTimeoutError('No answer from {0}-daemon at {1} within {2} seconds'.format(
+                                 RECLASS_NAME, path, timeout))
+    except socket.error as e:
+        raise DaemonError('Cannot talk to {0}-daemon at {1}: {2}'.format(RECLASS_NAME, path, e))
+    finally:
+        sock.close()
+    response = json.loads(b''.join(chunks).decode('utf-8'))
+    if 'error' in response:
+        raise DaemonError(response['error'], rc=response['rc'])
+    return response['result']
+
+
+class Client(object):
+    '''
+    Gets nodes and the inventory from the daemon listening on the unix
+    socket path. If the daemon does not answer in time, they are rendered
+    in this process by the Core make_core returns instead, for this and
+    all later requests.
+    '''
+
+    def __init__(self, path, make_core, timeout=OPT_DAEMON_TIMEOUT):
+        self._path = path
+        self._make_core = make_core
+        self._timeout = timeout
+        self._core = None
+
+    def _request(self, mode, nodename=None):
+        if self._core is None:
+            try:
+                return query(self._path, mode, nodename, self._timeout)
+            except DaemonTimeoutError as e:
+                print('[WARNING] {0}, rendering without it'.format(e.message), file=sys.stderr)
+                self._core = self._make_core()
+        if mode == 'nodeinfo':
+            return self._core.nodeinfo(nodename)
+        return self._core.inventory()
+
+    def nodeinfo(self, nodename):
+        return self._request('nodeinfo', nodename)
+
+    def inventory(self):
+        return self._request('inventory')
+
+
+def main():
+    try:
+        defaults = find_and_read_configfile()
+        parser = optparse.OptionParser(version=VERSION)
+        parser.prog = RECLASS_NAME + '-daemon'
+        parser.usage = '%prog [options] --daemon-socket PATH'
+        parser.description = 'Serve nodes to {0} clients from a long-lived process'.format(RECLASS_NAME)
+        parser.add_option_group(make_db_options_group(parser, defaults))
+        parser.add_option_group(make_performance_options_group(parser, defaults))
+        options, args = parser.parse_args()
+        if len(args) > 0:
+            parser.error('No arguments allowed')
+        elif options.daemon_socket is None:
+            parser.error('Must specify --daemon-socket')
+        elif options.inventory_base_uri is None and options.nodes_uri is None:
+            parser.error('Must specify --inventory-base-uri or --nodes-uri')
+        elif options.inventory_base_uri is None and options.classes_uri is None:
+            parser.error('Must specify --inventory-base-uri or --classes-uri')
+
+        path_mangler = get_path_mangler(options.storage_type)
+        nodes_uri, classes_uri = path_mangler(options.inventory_base_uri, options.nodes_uri, options.classes_uri)
+        class_mappings = defaults.get('class_mappings')
+        defaults.update(vars(options))
+        settings = Settings(defaults)
+
+        def make_core():
+            storage = get_storage(options.storage_type, nodes_uri, classes_uri,
+                                  options.compose_node_name)
+            return Core(storage, class_mappings, settings, workers=options.jobs,
+                        cache_dir=options.cache_dir)
+
+        watch_dirs = ()
+        if options.storage_type == 'yaml_fs':
+            watch_dirs = (nodes_uri, classes_uri)
+        serve(Daemon(make_core, watch_dirs), options.daemon_socket)
+
+    except ReclassException as e:
+        e.exit_with_message(sys.stderr)
+
+    sys.exit(posix.EX_OK)
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,11 @@ class Applications(Classes):
         self._negations = []
         super(Applications, self).__init__(iterable)
 
+    def __copy__(self):
+        result = super(Applications, self).__copy__()
+        result._negations = self._negations[:]
+        return result
+
     def append_if_new(self, item):
         self._assert_is_string(item)
         if item.startswith(self.negation_prefix):
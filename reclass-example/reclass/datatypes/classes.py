@@ -32,6 +32,13 @@ class Classes(object):
     def __len__(self):
         return len(self._items)
 
+    def __copy__(self):
+        cls = self.__class__
+        result = cls.__new__(cls)
+        result.__dict__.update(self.__dict__)
+        result._items = self._items[:]
+        return result
+
     def __eq__(self, rhs):
         if isinstance(rhs, list):
             return self._items == rhs
@@ -11,6 +11,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import copy
+
 from .classes import Classes
 from .applications import Applications
 from .exports import Exports
@@ -88,6 +90,28 @@ class Entity(object):
     def interpolate_single_export(self, references):
         self._exports.interpolate_single_from_external(self._parameters, references)
 
+    def __copy__(self):
+        # the parameters and exports are copied too, so that interpolating
+        # the copy leaves the merged (uninterpolated) trees of self untouched
+        cls = self.__class__
+        result = cls.__new__(cls)
+        result.__dict__.update(self.__dict__)
+        result._parameters = copy.copy(self._parameters)
+        result._exports = copy.copy(self._exports)
+        return result
+
+    def clone(self):
+        '''
+        Returns a copy of this (merged, uninterpolated) entity which other
+        entities can be merged into without changing this one.
+        '''
+        result = copy.copy(self)
+        result._classes = copy.copy(self._classes)
+        result._applications = copy.copy(self._applications)
+        result._parameters = self._parameters.clone()
+        result._exports = self._exports.clone()
+        return result
+
     def __eq__(self, other):
         return isinstance(other, type(self)) \
                 and self._applications == other.applications \
@@ -27,6 +27,15 @@ class Exports(Parameters):
         self._base.pop(key, None)
         self._unrendered.pop(key, None)
 
+    def drop_unrendered(self):
+        '''
+        Remove the exports which were not interpolated, leaving only
+        rendered data.
+        '''
+        for path in self._unrendered:
+            path.delete(self._base)
+        self._unrendered = {}
+
     def overwrite(self, other):
         overdict = {'~' + key: value for (key, value) in iteritems(other)}
         self.merge(overdict)
@@ -46,8 +46,9 @@ class Parameters(object):
          are collected during merging and then resolved during interpolation,
          which avoids having to walk the dictionary twice. If a referenced
          value contains references itself, those are resolved first, in
-         topological order. Therefore, deep references work. Cyclical
-         references cause an error.
+         topological order, without recursion. Therefore, deep references
+         work. Cyclical references cause an error, with group_errors set
+         all of them are reported together.
 
     To support these specialities, this class only exposes very limited
     functionality and does not try to be a really mapping object.
@@ -58,6 +59,7 @@ class Parameters(object):
         self._uri = uri
         self._base = ParameterDict(uri=self._uri)
         self._unrendered = None
+        self._ref_paths = {}
         self._inv_queries = []
         self.resolve_errors = ResolveErrorList()
         self.needs_all_envs = False
@@ -124,33 +126,164 @@ class Parameters(object):
             d[k] = self._get_wrapped(k, v)
         return d
 
-    def _update_value(self, cur, new):
+    def _freeze(self, value):
+        # mark value and all containers below it as shared, returning
+        # whether merging would leave them as they are
+        if value.frozen:
+            return value.plain
+        if isinstance(value, dict):
+            prefixes = self._settings.dict_key_prefixes
+            plain = all(isinstance(k, str) and k != '' and k[0] not in prefixes
+                        for k in value)
+            children = value.values()
+        else:
+            plain = True
+            children = value
+        for v in children:
+            if isinstance(v, (ParameterDict, ParameterList)):
+                if not self._freeze(v) or v.uri != value.uri:
+                    plain = False
+        value.frozen = True
+        value.plain = plain
+        return plain
+
+    def _thaw(self, value):
+        # a copy of the shared container value which can be changed, the
+        # containers below it stay shared
+        if isinstance(value, ParameterDict):
+            d = ParameterDict(uri=value.uri)
+            for (k, v) in iteritems(value):
+                d[k] = copy.copy(v) if isinstance(v, ValueList) else v
+            return d
+        return ParameterList(value, uri=value.uri)
+
+    def _clone_value(self, value):
+        if isinstance(value, (ParameterDict, ParameterList)) and value.frozen:
+            return value
+        if isinstance(value, ParameterDict):
+            d = ParameterDict(uri=value.uri)
+            for (k, v) in iteritems(value):
+                d[k] = self._clone_value(v)
+            return d
+        elif isinstance(value, ParameterList):
+            return ParameterList([self._clone_value(v) for v in value],
+                                 uri=value.uri)
+        elif isinstance(value, ValueList):
+            return copy.copy(value)
+        return value
+
+    def clone(self):
+        """Copy the merged (uninterpolated) parameters.
+
+        The containers are copied, so the clone can be merged into without
+        changing self. Values and shared containers are not, merging never
+        changes the former and copies the latter.
+
+        Returns:
+            Parameters: the copy
+
+        """
+
+        result = copy.copy(self)
+        result._base = self._clone_value(self._base)
+        result._unrendered = None
+        result._inv_queries = []
+        return result
+
+    def freeze(self):
+        """Share the merged (uninterpolated) parameters from now on.
+
+        Clones of frozen parameters and parameters they are merged into
+        share their tree instead of copying it, and copy the parts they
+        change. Nothing changes the tree in place any more.
+
+        Returns:
+            Parameters: self
+
+        """
+
+        self._freeze(self._base)
+        return self
+
+    def _holds_unmerged(self, cur, new):
+        if isinstance(new, dict):
+            if not isinstance(cur, dict) or len(cur) != len(new):
+                return False
+            return all(self._holds_unmerged(cur.get(k), v)
+                       for (k, v) in iteritems(new))
+        elif isinstance(new, list):
+            if not isinstance(cur, list) or len(cur) != len(new):
+                return False
+            return all(self._holds_unmerged(c, v) for (c, v) in zip(cur, new))
+        return cur is new
+
+    def holds_unmerged(self, other):
+        """Check that the top level keys of other were merged into self
+        without being changed by any other merge.
+
+        Args:
+            other (Parameters): parameters merged into self before
+
+        Returns:
+            bool: True if replace_unmerged can swap in parameters of the
+                  same shape as other
+
+        """
+
+        return all(self._holds_unmerged(self._base.get(k), v)
+                   for (k, v) in iteritems(other._base))
+
+    def _replace_unmerged(self, cur, new):
+        if cur.frozen:
+            cur = self._thaw(cur)
+        items = iteritems(new) if isinstance(new, dict) else enumerate(new)
+        for (k, v) in items:
+            if isinstance(v, (dict, list)):
+                cur[k] = self._replace_unmerged(cur[k], v)
+            else:
+                cur[k] = v
+        return cur
+
+    def replace_unmerged(self, other):
+        """Replace values merged from parameters checked by holds_unmerged
+        with the values of other, which must have the same shape.
+
+        Args:
+            other (Parameters): parameters to put in place
+
+        Returns:
+            None: Nothing
+
+        """
+
+        self._unrendered = None
+        self._base = self._replace_unmerged(self._base, other._base)
+
+    def _update_value(self, cur, new, uri):
         if isinstance(cur, Value):
             values = ValueList(cur, self._settings)
         elif isinstance(cur, ValueList):
             values = cur
         else:
             if isinstance(cur, (ParameterDict, ParameterList)):
-                uri = cur.uri
+                cur_uri = cur.uri
             else:
-                uri = self._uri
-            values = ValueList(Value(cur, self._settings, uri), self._settings)
+                cur_uri = self._uri
+            values = ValueList(Value(cur, self._settings, cur_uri), self._settings)
 
         if isinstance(new, Value):
             values.append(new)
         elif isinstance(new, ValueList):
             values.extend(new)
         else:
-            if isinstance(new, (ParameterDict, ParameterList)):
-                uri = new.uri
-            else:
+            if not isinstance(new, (ParameterDict, ParameterList)):
                 uri = self._uri
             values.append(Value(new, self._settings, uri,
                                 parse_string=self._parse_strings))
 
         return values
 
-    def _merge_dict(self, cur, new):
+    def _merge_dict(self, cur, new, uri):
         """Merge a dictionary with another dictionary.
 
         Iterate over keys in new. If this is not an initialization merge and
@@ -161,7 +294,7 @@ class Parameters(object):
         Args:
             cur (dict): Current dictionary
             new (dict): Dictionary to be merged
-            initmerge (bool): True if called as part of entity init
+            uri (str): uri of the parameters new comes from
 
         Returns:
             dict: a merged dictionary
@@ -179,15 +312,15 @@ class Parameters(object):
                     value.overwrite = True
                 elif key[0] == self._settings.dict_key_constant_prefix:
                     value.constant = True
-                value = self._merge_recurse(cur.get(newkey), value)
+                value = self._merge_recurse(cur.get(newkey), value, uri)
                 key = newkey
             else:
-                value = self._merge_recurse(cur.get(key), value)
+                value = self._merge_recurse(cur.get(key), value, uri)
             cur[key] = value
-        cur.uri = new.uri
+        cur.uri = uri
         return cur
 
-    def _merge_recurse(self, cur, new):
+    def _merge_recurse(self, cur, new, uri):
         """Merge a parameter with another parameter.
 
         Iterate over keys in new. Call _merge_dict, _update_value
@@ -196,6 +329,7 @@ class Parameters(object):
         Args:
             cur: Current parameter
             new: Parameter to be merged
+            uri (str): uri of the parameters new comes from
 
         Returns:
             merged parameter (Value or ValueList)
@@ -204,22 +338,41 @@ class Parameters(object):
 
         if isinstance(new, dict):
             if cur is None:
+                if self._shareable(new, uri):
+                    return new
                 cur = ParameterDict(uri=self._uri)
             if isinstance(cur, dict):
-                return self._merge_dict(cur, new)
+                if isinstance(cur, ParameterDict) and cur.frozen:
+                    cur = self._thaw(cur)
+                return self._merge_dict(cur, new, uri)
             else:
-                return self._update_value(cur, new)
+                return self._update_value(cur, new, uri)
         else:
             if cur is None:
+                if isinstance(new, ValueList):
+                    # value lists are extended in place by later merges, so
+                    # never adopt one which may be shared with other
+                    # parameters (e.g. cached class entities)
+                    return copy.copy(new)
+                if isinstance(new, ParameterList) and not self._shareable(new, uri):
+                    return ParameterList(new, uri=uri)
                 return new
             else:
-                return self._update_value(cur, new)
+                return self._update_value(cur, new, uri)
+
+    def _shareable(self, new, uri):
+        # containers are merged as they are if merging would not change them
+        # anyway, and frozen so that nobody changes them in place
+        return (isinstance(new, (ParameterDict, ParameterList))
+                and self._freeze(new) and new.uri == uri)
 
     def merge(self, other):
         """Merge function (public edition).
 
         Call _merge_recurse on self with either another Parameter object or a
-        dict (for initialization). Set initmerge if it's a dict.
+        dict (for initialization). Containers of the merged tree which self
+        does not hold yet are shared instead of copied, see _shareable, so
+        the cost of a merge depends on the keys both trees hold.
 
         Args:
             other (dict or Parameter): Thing to merge with self._base
@@ -231,17 +384,27 @@ class Parameters(object):
 
         self._unrendered = None
         if isinstance(other, dict):
-            wrapped = self._wrap_dict(other)
+            self._base = self._merge_recurse(self._base, self._wrap_dict(other),
+                                             self._uri)
         elif isinstance(other, self.__class__):
-            wrapped = other._wrap_dict(other._base)
+            if other._unrendered is None:
+                self._base = self._merge_recurse(self._base, other._base,
+                                                 other._uri)
+            else:
+                # rendered values are plain data which need wrapping
+                self._base = self._merge_recurse(self._base,
+                                                 other._wrap_dict(other._base),
+                                                 other._uri)
         else:
             raise TypeError('Cannot merge %s objects into %s' % (type(other),
                             self.__class__.__name__))
-        self._base = self._merge_recurse(self._base, wrapped)
 
     def _render_simple_container(self, container, key, value, path):
         if isinstance(value, ValueList):
             if value.is_complex:
+                # interpolation changes the references of the value list,
+                # which may be shared with other parameters
+                value = copy.copy(value)
                 p = path.new_subpath(key)
                 self._unrendered[p] = True
                 container[key] = value
@@ -287,11 +450,12 @@ class Parameters(object):
     def interpolate(self, inventory=None):
         self._initialise_interpolate()
         while len(self._unrendered) > 0:
-            # we could use a view here, but this is simple enough:
-            # _interpolate_inner removes references from the refs hash after
-            # processing them, so we cannot just iterate the dict
-            path, v = next(iteritems(self._unrendered))
-            self._interpolate_inner(path, inventory)
+            # interpolating a value renders the values it refers to as well
+            # and may add the values of rendered dicts and lists, so the
+            # paths are taken in order, skipping those already rendered
+            for path in list(self._unrendered):
+                if path in self._unrendered:
+                    self._interpolate_inner(path, inventory)
         if self.resolve_errors.have_errors():
             raise self.resolve_errors
 
@@ -317,10 +481,7 @@ class Parameters(object):
             del self._unrendered[path]
             return
         self._unrendered[path] = False
-        self._interpolate_references(path, value, inventory)
-        new = self._interpolate_render_value(path, value, inventory)
-        path.set_value(self._base, new)
-        del self._unrendered[path]
+        self._interpolate_walk(path, value, inventory, True)
 
     def _interpolate_render_value(self, path, value, inventory):
         try:
@@ -343,36 +504,92 @@ class Parameters(object):
         return new
 
     def _interpolate_references(self, path, value, inventory):
-        all_refs = False
-        while not all_refs:
+        # render all values value refers to, but not value itself
+        self._interpolate_walk(path, value, inventory, False)
+
+    def _interpolate_walk(self, path, value, inventory, render):
+        # Render the values value refers to depth first, each one after the
+        # values it refers to in turn, then value itself if render is set.
+        # Values being rendered are marked False in self._unrendered, which
+        # only holds values still to render. The stack holds a generator of
+        # the paths still to render before it for every value on the way.
+        # With group_errors, cyclic references are collected like failed
+        # references and leave the value at None, otherwise they are raised.
+        collect = render and self._settings.group_errors
+        stack = [(path, value, self._pending_references(path, value))]
+        while len(stack) > 0:
+            path, value, pending = stack[-1]
+            try:
+                ref_path = next(pending, None)
+            except InfiniteRecursionError as e:
+                if not collect:
+                    raise
+                self.resolve_errors.add(e)
+                stack.pop()
+                path.set_value(self._base, None)
+                del self._unrendered[path]
+                continue
+            if ref_path is None:
+                stack.pop()
+                if len(stack) > 0 or render:
+                    new = self._interpolate_render_value(path, value, inventory)
+                    path.set_value(self._base, new)
+                    del self._unrendered[path]
+                continue
+            ref_value = ref_path.get_value(self._base)
+            if isinstance(ref_value, (Value, ValueList)):
+                self._unrendered[ref_path] = False
+                stack.append((ref_path, ref_value,
+                              self._pending_references(ref_path, ref_value)))
+            else:
+                # see _interpolate_inner
+                del self._unrendered[ref_path]
+
+    def _reference_paths(self, ref):
+        # The path of ref and of its ancestors, top down. References are
+        # shared by many values, so the paths are only made once.
+        paths = self._ref_paths.get(ref)
+        if paths is None:
+            path_from_ref = DictPath(self._settings.delimiter, ref)
+            ancestors = []
+            ancestor = DictPath(self._settings.delimiter)
+            for k in path_from_ref.key_parts():
+                ancestor = ancestor.new_subpath(k)
+                ancestors.append(ancestor)
+            paths = self._ref_paths[ref] = (path_from_ref, ancestors)
+        return paths
+
+    def _pending_references(self, path, value):
+        # Yield the paths of the unrendered values value refers to, which
+        # are either the referenced paths or their ancestors. As rendering
+        # them changes self._unrendered, every path is checked just before
+        # it is yielded.
+        unrendered = self._unrendered
+        while True:
             for ref in value.get_references():
-                path_from_ref = DictPath(self._settings.delimiter, ref)
-
-                if path_from_ref in self._unrendered:
-                    if self._unrendered[path_from_ref] is False:
-                        # every call to _interpolate_inner replaces the value of
-                        # self._unrendered[path] with False
-                        # Therefore, if we encounter False instead of True,
-                        # it means that we have already processed it and are now
-                        # faced with a cyclical reference.
-                        raise InfiniteRecursionError(path, ref, value.uri)
-                    else:
-                        self._interpolate_inner(path_from_ref, inventory)
+                path_from_ref, ancestors = self._reference_paths(ref)
+                state = unrendered.get(path_from_ref)
+                if state is False:
+                    # every value being rendered is marked False, so this
+                    # one is already on the way to value
+                    raise InfiniteRecursionError(path, ref, value.uri)
+                elif state is True:
+                    yield path_from_ref
                 else:
                     # ensure ancestor keys are already dereferenced
-                    ancestor = DictPath(self._settings.delimiter)
-                    for k in path_from_ref.key_parts():
-                        ancestor = ancestor.new_subpath(k)
-                        if ancestor in self._unrendered:
-                            self._interpolate_inner(ancestor, inventory)
+                    for ancestor in ancestors:
+                        state = unrendered.get(ancestor)
+                        if state is False:
+                            raise InfiniteRecursionError(path, ref, value.uri)
+                        elif state is True:
+                            yield ancestor
             if value.allRefs:
-                all_refs = True
-            else:
-                # not all references in the value could be calculated previously so
-                # try recalculating references with current context and recursively
-                # call _interpolate_inner if the number of references has increased
-                # Otherwise raise an error
-                old = len(value.get_references())
-                value.assembleRefs(self._base)
-                if old == len(value.get_references()):
-                    raise BadReferencesError(value.get_references(), str(path), value.uri)
+                return
+            # not all references in the value could be calculated previously so
+            # try recalculating references with current context and go over
+            # them again if the number of references has increased
+            # Otherwise raise an error
+            old = len(value.get_references())
+            value.assembleRefs(self._base)
+            if old == len(value.get_references()):
+                raise BadReferencesError(value.get_references(), str(path), value.uri)
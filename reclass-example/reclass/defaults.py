@@ -24,6 +24,13 @@ OPT_GROUP_ERRORS = True
 OPT_COMPOSE_NODE_NAME = False
 OPT_NO_REFS = False
 OPT_OUTPUT = 'yaml'
+OPT_STREAM = False
+OPT_JOBS = 1
+OPT_CACHE_DIR = None
+OPT_DAEMON_SOCKET = None
+OPT_DAEMON_TIMEOUT = 60
+OPT_PROFILE = False
+OPT_PROFILE_FILE = None
 
 OPT_IGNORE_CLASS_NOTFOUND = False
 OPT_IGNORE_CLASS_NOTFOUND_REGEXP = ['.*']
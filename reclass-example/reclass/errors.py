@@ -53,6 +53,18 @@ class ReclassException(Exception):
         sys.exit(self.rc)
 
 
+class DaemonError(ReclassException):
+
+    def __init__(self, msg, rc=posix.EX_UNAVAILABLE):
+        super(DaemonError, self).__init__(rc=rc, msg=msg, tbFlag=False)
+
+
+class DaemonTimeoutError(DaemonError):
+
+    def __init__(self, msg, rc=posix.EX_TEMPFAIL):
+        super(DaemonTimeoutError, self).__init__(rc=rc, msg=msg)
+
+
 class PermissionError(ReclassException):
 
     def __init__(self, msg, rc=posix.EX_NOPERM):
@@ -19,6 +19,11 @@ class OutputterBase(object):
     def dump(self, data, pretty_print=False):
         raise NotImplementedError("dump() method not implemented.")
 
+    def dump_stream(self, items, pretty_print=False, no_refs=False):
+        # dump (nodename, nodeinfo) pairs one at a time, as {nodename: nodeinfo}
+        for (name, data) in items:
+            yield self.dump({name: data}, pretty_print=pretty_print, no_refs=no_refs) + '\n'
+
 
 class OutputLoader(object):
 
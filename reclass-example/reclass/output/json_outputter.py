@@ -21,3 +21,8 @@ class Outputter(OutputterBase):
         separators = (',', ': ') if pretty_print else (',', ':')
         indent = 2 if pretty_print else None
         return json.dumps(data, indent=indent, separators=separators)
+
+    def dump_stream(self, items, pretty_print=False, no_refs=False):
+        # newline delimited JSON, one object per line whatever pretty_print says
+        for (name, data) in items:
+            yield json.dumps({name: data}, separators=(',', ':')) + '\n'
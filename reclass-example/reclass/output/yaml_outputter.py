@@ -19,11 +19,16 @@ _SafeDumper = yaml.CSafeDumper if yaml.__with_libyaml__ else yaml.SafeDumper
 
 class Outputter(OutputterBase):
 
-    def dump(self, data, pretty_print=False, no_refs=False):
+    def dump(self, data, pretty_print=False, no_refs=False, **kwargs):
         if (no_refs):
-            return yaml.dump(data, default_flow_style=not pretty_print, Dumper=ExplicitDumper)
+            return yaml.dump(data, default_flow_style=not pretty_print, Dumper=ExplicitDumper, **kwargs)
         else:
-            return yaml.dump(data, default_flow_style=not pretty_print, Dumper=_SafeDumper)
+            return yaml.dump(data, default_flow_style=not pretty_print, Dumper=_SafeDumper, **kwargs)
+
+    def dump_stream(self, items, pretty_print=False, no_refs=False):
+        # a stream of YAML documents, one per node
+        for (name, data) in items:
+            yield self.dump({name: data}, pretty_print, no_refs, explicit_start=True)
 
 
 class ExplicitDumper(_SafeDumper):
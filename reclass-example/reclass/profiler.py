@@ -0,0 +1,155 @@
+#
+# -*- coding: utf-8 -*-
+#
+# This file is part of reclass (http://github.com/madduck/reclass)
+#
+# Released under the terms of the Artistic Licence 2.0
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import contextlib
+import functools
+import json
+import time
+
+from six import iteritems
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+# the node of a phase is taken from this positional argument, phases
+# without one are charged to the node they are called for
+_NODE_ARG = {'merge': 1, 'nodeinfo': 1}
+
+
+def _phases():
+    from reclass.core import Core
+    from reclass.datatypes import Parameters
+    from reclass.storage.yamldata import YamlData
+    from reclass.values.invitem import InvItem
+    from reclass.values.parser import Parser
+    return [('yaml', YamlData, 'from_file'),
+            ('yaml', YamlData, 'from_string'),
+            ('merge', Core, '_node_entity'),
+            ('classes', Core, '_recurse_entity'),
+            ('parse', Parser, 'parse'),
+            ('nodeinfo', Core, '_nodeinfo'),
+            ('interpolate', Parameters, 'interpolate'),
+            ('inv_query', InvItem, 'render'),
+            ('exports', Core, '_get_inventory'),
+           ]
+
+
+class Profiler(object):
+    '''
+    Accumulates wall time and call counts per phase of a run, both in total
+    and per node.
+
+    install() wraps the functions doing the work of every phase and
+    uninstall() puts the originals back, so nothing is measured or slowed
+    down unless a profiler is installed. Phases nest, the total time of a
+    phase includes the phases called from it while its self time does not.
+    Recursive calls are counted, but their time only once. Only the calling
+    process is measured, not the workers started for -j.
+    '''
+
+    def __init__(self):
+        self.phases = {}
+        self.nodes = {}
+        self._stack = []
+        self._installed = []
+
+    def _enter(self, phase, node):
+        if node is None and self._stack:
+            node = self._stack[-1][1]
+        self._stack.append([phase, node, _clock(), 0.0])
+
+    def _leave(self):
+        phase, node, start, children = self._stack.pop()
+        elapsed = _clock() - start
+        recursive = any(frame[0] == phase for frame in self._stack)
+        for stats in (self.phases, self.nodes.setdefault(node, {})):
+            calls, total, own = stats.get(phase, (0, 0.0, 0.0))
+            if not recursive:
+                total += elapsed
+            stats[phase] = (calls + 1, total, own + elapsed - children)
+        if self._stack:
+            self._stack[-1][3] += elapsed
+
+    @contextlib.contextmanager
+    def phase(self, name, node=None):
+        ''' Measure the enclosed block as a phase of its own '''
+        self._enter(name, node)
+        try:
+            yield
+        finally:
+            self._leave()
+
+    def _wrap(self, phase, owner, name):
+        original = owner.__dict__[name]
+        kind = type(original) if isinstance(original, (classmethod, staticmethod)) else None
+        func = original.__func__ if kind is not None else original
+        node_arg = _NODE_ARG.get(phase)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            node = None
+            if node_arg is not None and len(args) > node_arg:
+                node = args[node_arg]
+            self._enter(phase, node)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._leave()
+
+        setattr(owner, name, kind(wrapper) if kind is not None else wrapper)
+        self._installed.append((owner, name, original))
+
+    def install(self):
+        for phase, owner, name in _phases():
+            self._wrap(phase, owner, name)
+
+    def uninstall(self):
+        while self._installed:
+            owner, name, original = self._installed.pop()
+            setattr(owner, name, original)
+
+    @staticmethod
+    def _as_dict(stats):
+        return dict((phase, {'calls': calls, 'total': total, 'self': own})
+                    for (phase, (calls, total, own)) in iteritems(stats))
+
+    @staticmethod
+    def _parse_cache_stats():
+        from reclass.values.value import Value
+        return Value._parser.cache_stats()
+
+    def as_dict(self):
+        return {'phases': self._as_dict(self.phases),
+                'nodes': dict((node, self._as_dict(stats))
+                              for (node, stats) in iteritems(self.nodes) if node is not None),
+                'parse_cache': self._parse_cache_stats()
+               }
+
+    def write_json(self, path):
+        with open(path, 'w') as fp:
+            json.dump(self.as_dict(), fp, indent=2, sort_keys=True)
+
+    def summary(self, top=10):
+        lines = ['{0:<12} {1:>10} {2:>10} {3:>10}'.format('phase', 'calls', 'total', 'self')]
+        phases = sorted(iteritems(self.phases), key=lambda item: -item[1][2])
+        for phase, (calls, total, own) in phases:
+            lines.append('{0:<12} {1:>10} {2:>10.3f} {3:>10.3f}'.format(phase, calls, total, own))
+        nodes = [ (sum(s[2] for s in stats.values()), node)
+                  for (node, stats) in iteritems(self.nodes) if node is not None ]
+        if nodes:
+            lines.append('')
+            lines.append('{0:<40} {1:>10}'.format('slowest nodes', 'self'))
+            for own, node in sorted(nodes, reverse=True)[:top]:
+                lines.append('{0:<40} {1:>10.3f}'.format(node, own))
+        cache = self._parse_cache_stats()
+        lines.append('')
+        lines.append('parse cache: {hits} hits, {misses} misses, {entries} of {size} entries'.format(**cache))
+        return '\n'.join(lines) + '\n'
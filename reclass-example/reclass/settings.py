@@ -46,26 +46,47 @@ class Settings(object):
     }
 
     def __init__(self, options={}):
+        set_option = super(Settings, self).__setattr__
         for opt_name, opt_value in iteritems(self.known_opts):
-            setattr(self, opt_name, options.get(opt_name, opt_value))
+            set_option(opt_name, _freeze(options.get(opt_name, opt_value)))
 
-        self.dict_key_prefixes = [str(self.dict_key_override_prefix),
-                                  str(self.dict_key_constant_prefix)]
+        set_option('dict_key_prefixes', (str(self.dict_key_override_prefix),
+                                         str(self.dict_key_constant_prefix)))
         if isinstance(self.ignore_class_notfound_regexp, string_types):
-            self.ignore_class_notfound_regexp = [
-                    self.ignore_class_notfound_regexp]
+            set_option('ignore_class_notfound_regexp',
+                       (self.ignore_class_notfound_regexp,))
+        # settings never change, so they are compared and hashed by this
+        set_option('fingerprint', tuple((opt, getattr(self, opt))
+                                        for opt in sorted(self.known_opts)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Settings cannot be changed')
+
+    def __delattr__(self, name):
+        raise AttributeError('Settings cannot be changed')
 
     def __eq__(self, other):
         if isinstance(other, type(self)):
-            return all(getattr(self, opt) == getattr(other, opt)
-                       for opt in self.known_opts)
+            return self.fingerprint == other.fingerprint
         return False
 
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
     def __copy__(self):
-        cls = self.__class__
-        result = cls.__new__(cls)
-        result.__dict__.update(self.__dict__)
-        return result
+        # immutable, so there is nothing to copy
+        return self
 
     def __deepcopy__(self, memo):
-        return self.__copy__()
+        return self
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for (k, v) in iteritems(value)))
+    return value
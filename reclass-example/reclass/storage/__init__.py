@@ -28,6 +28,20 @@ class NodeStorageBase(object):
         msg = "Storage class '{0}' does not implement class entity retrieval."
         raise NotImplementedError(msg.format(self.name))
 
+    def get_node_fingerprint(self, name):
+        msg = "Storage class '{0}' does not implement node fingerprints."
+        raise NotImplementedError(msg.format(self.name))
+
+    def get_class_fingerprint(self, name, environment):
+        msg = "Storage class '{0}' does not implement class fingerprints."
+        raise NotImplementedError(msg.format(self.name))
+
+    def invalidate(self, nodes=None, classes=None):
+        # storages without caches always return the current data, so there
+        # is nothing to forget here. nodes is a list of node names, classes
+        # one of (name, environment) tuples, None stands for all of them.
+        pass
+
     def enumerate_nodes(self):
         msg = "Storage class '{0}' does not implement node enumeration."
         raise NotImplementedError(msg.format(self.name))
@@ -56,6 +56,27 @@ class MemcacheProxy(NodeStorageBase):
             self._classes_cache[environment][name] = ret
         return ret
 
+    def get_node_fingerprint(self, name):
+        return self._real_storage.get_node_fingerprint(name)
+
+    def get_class_fingerprint(self, name, environment):
+        return self._real_storage.get_class_fingerprint(name, environment)
+
+    def invalidate(self, nodes=None, classes=None):
+        if self._cache_nodes:
+            if nodes is None:
+                self._nodes_cache = {}
+            else:
+                for name in nodes:
+                    self._nodes_cache.pop(name, None)
+        if self._cache_classes:
+            if classes is None:
+                self._classes_cache = {}
+            else:
+                for (name, environment) in classes:
+                    self._classes_cache.get(environment, {}).pop(name, None)
+        self._real_storage.invalidate(nodes, classes)
+
     def enumerate_nodes(self):
         if not self._cache_nodelist:
             return self._real_storage.enumerate_nodes()
@@ -60,5 +60,20 @@ class ExternalNodeStorage(ExternalNodeStorageBase):
         storage = self._classes_storage.get(environment, self._classes_default_storage)
         return storage.get_class(name, environment, settings)
 
+    def get_node_fingerprint(self, name):
+        return self._nodes_storage.get_node_fingerprint(name)
+
+    def get_class_fingerprint(self, name, environment):
+        storage = self._classes_storage.get(environment, self._classes_default_storage)
+        return storage.get_class_fingerprint(name, environment)
+
+    def invalidate(self, nodes=None, classes=None):
+        # each storage only forgets what it is used for here, as None
+        # would make it forget all of the other kind
+        self._nodes_storage.invalidate(nodes, ())
+        self._classes_default_storage.invalidate((), classes)
+        for storage in self._classes_storage.values():
+            storage.invalidate((), classes)
+
     def enumerate_nodes(self):
         return self._nodes_storage.enumerate_nodes()
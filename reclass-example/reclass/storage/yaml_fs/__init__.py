@@ -11,6 +11,7 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import hashlib
 import os, sys
 import yaml
 from reclass.output.yaml_outputter import ExplicitDumper
@@ -27,6 +28,13 @@ def vvv(msg):
     #print(msg, file=sys.stderr)
     pass
 
+def file_fingerprint(path):
+    # the path is part of the fingerprint as it ends up in the entity uri
+    h = hashlib.sha1(path.encode('utf-8'))
+    with open(path, 'rb') as fp:
+        h.update(fp.read())
+    return h.hexdigest()
+
 def path_mangler(inventory_base_uri, nodes_uri, classes_uri):
 
     if inventory_base_uri is None:
@@ -64,6 +72,11 @@ class ExternalNodeStorage(ExternalNodeStorageBase):
             self._classes_uri = classes_uri
             self._classes = self._enumerate_inventory(classes_uri, self.class_name_mangler)
 
+        # loaded files by node and class name, classes are the same in all
+        # environments
+        self._node_data = {}
+        self._class_data = {}
+
     nodes_uri = property(lambda self: self._nodes_uri)
     classes_uri = property(lambda self: self._classes_uri)
 
@@ -97,7 +110,7 @@ class ExternalNodeStorage(ExternalNodeStorageBase):
             path = os.path.join(self.nodes_uri, relpath)
         except KeyError as e:
             raise reclass.errors.NodeNotFound(self.name, name, self.nodes_uri)
-        entity = YamlData.from_file(path).get_entity(name, settings)
+        entity = self._load(self._node_data, name, path).get_entity(name, settings)
         return entity
 
     def get_class(self, name, environment, settings):
@@ -106,8 +119,36 @@ class ExternalNodeStorage(ExternalNodeStorageBase):
             path = os.path.join(self.classes_uri, self._classes[name])
         except KeyError as e:
             raise reclass.errors.ClassNotFound(self.name, name, self.classes_uri)
-        entity = YamlData.from_file(path).get_entity(name, settings)
+        entity = self._load(self._class_data, name, path).get_entity(name, settings)
         return entity
 
+    def _load(self, loaded, name, path):
+        data = loaded.get(name)
+        if data is None:
+            data = loaded[name] = YamlData.from_file(path)
+        return data
+
+    def invalidate(self, nodes=None, classes=None):
+        if nodes is None:
+            self._node_data = {}
+        else:
+            for name in nodes:
+                self._node_data.pop(name, None)
+        if classes is None:
+            self._class_data = {}
+        else:
+            for (name, environment) in classes:
+                self._class_data.pop(name, None)
+
+    def get_node_fingerprint(self, name):
+        if name not in self._nodes:
+            return None
+        return file_fingerprint(os.path.join(self.nodes_uri, self._nodes[name]))
+
+    def get_class_fingerprint(self, name, environment):
+        if name not in self._classes:
+            return None
+        return file_fingerprint(os.path.join(self.classes_uri, self._classes[name]))
+
     def enumerate_nodes(self):
         return self._nodes.keys()
@@ -291,6 +291,24 @@ class ExternalNodeStorage(ExternalNodeStorageBase):
         entity = YamlData.from_string(blob.data, 'git_fs://{0} {1} {2}'.format(uri.repo, uri.branch, file.path)).get_entity(name, settings)
         return entity
 
+    def get_node_fingerprint(self, name):
+        if name not in self._nodes:
+            return None
+        file = self._nodes[name]
+        return '{0} {1} {2} {3}'.format(self._nodes_uri.repo, self._nodes_uri.branch, file.path, file.id)
+
+    def get_class_fingerprint(self, name, environment):
+        uri = self._env_to_uri(environment)
+        if uri.root is not None:
+            name = '{0}.{1}'.format(uri.root, name)
+        if uri.repo not in self._repos:
+            return None
+        files = self._repos[uri.repo].files.get(uri.branch, {})
+        if name not in files:
+            return None
+        file = files[name]
+        return '{0} {1} {2} {3}'.format(uri.repo, uri.branch, file.path, file.id)
+
     def enumerate_nodes(self):
         return self._nodes.keys()
 
@@ -47,6 +47,7 @@ class YamlData(object):
     def __init__(self, uri):
         self._uri = uri
         self._data = dict()
+        self._compiled = {}
 
     uri = property(lambda self: self._uri)
 
@@ -95,6 +96,22 @@ class YamlData(object):
             applications = []
         applications = datatypes.Applications(applications)
 
+        parameters, exports = self._get_compiled(settings)
+
+        env = self._data.get('environment', None)
+
+        return datatypes.Entity(settings, classes=classes, applications=applications,
+                                parameters=parameters.clone(), exports=exports.clone(),
+                                name=name, environment=env, uri=self.uri)
+
+    def _get_compiled(self, settings):
+        # The values of the file are parsed once per settings into frozen
+        # trees, which all entities of the file share through clones.
+        try:
+            return self._compiled[settings]
+        except KeyError:
+            pass
+
         parameters = self._data.get('parameters')
         if parameters is None:
             parameters = {}
@@ -105,10 +122,8 @@ class YamlData(object):
             exports = {}
         exports = datatypes.Exports(exports, settings, self._uri)
 
-        env = self._data.get('environment', None)
-
-        return datatypes.Entity(settings, classes=classes, applications=applications, parameters=parameters,
-                                exports=exports, name=name, environment=env, uri=self.uri)
+        compiled = self._compiled[settings] = (parameters.freeze(), exports.freeze())
+        return compiled
 
     def __str__(self):
         return '<{0} {1}, {2}>'.format(self.__class__.__name__, self._uri,
@@ -61,6 +61,7 @@ class DictPath(object):
 
     def __init__(self, delim, contents=None):
         self._delim = delim
+        self._hash = None
 
         if contents is None:
             self._parts = []
@@ -92,7 +93,11 @@ class DictPath(object):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(str(self))
+        # paths are mostly used as keys of the unrendered values, so the
+        # hash is kept until the path changes
+        if self._hash is None:
+            self._hash = hash(str(self))
+        return self._hash
 
     @property
     def path(self):
@@ -129,6 +134,7 @@ class DictPath(object):
 
     def drop_first(self):
         del self._parts[0]
+        self._hash = None
         return self
 
     def is_empty(self):
@@ -139,9 +145,11 @@ class DictPath(object):
 
     def add_subpath(self, key):
         self._parts.append(key)
+        self._hash = None
 
     def add_ancestor(self, key):
         self._parts.insert(0, key)
+        self._hash = None
 
     def is_ancestor_of(self, other):
         if len(other._parts) <= len(self._parts):
@@ -0,0 +1,57 @@
+#
+# -*- coding: utf-8 -*-
+#
+# This file is part of reclass (http://github.com/madduck/reclass)
+#
+# Released under the terms of the Artistic Licence 2.0
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+
+class Inventory(dict):
+    '''
+    The exports of all nodes by node name, as read by inventory queries.
+
+    Queries build indexes over the exports and keep them in index, which
+    is dropped whenever nodes are added, replaced or removed. The exports
+    of a node must not be changed in place once it is in the inventory.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.index = None
+
+    def __reduce__(self):
+        # the index is cheaper to build again than to pickle
+        return (self.__class__, (dict(self),))
+
+    def __setitem__(self, key, value):
+        self.index = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.index = None
+        dict.__delitem__(self, key)
+
+    def clear(self):
+        self.index = None
+        dict.clear(self)
+
+    def pop(self, *args):
+        self.index = None
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.index = None
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self.index = None
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self.index = None
+        dict.update(self, *args, **kwargs)
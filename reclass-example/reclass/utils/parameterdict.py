@@ -1,4 +1,10 @@
 class ParameterDict(dict):
+    # set once the container may be shared by several Parameters, which then
+    # copy it before changing it; plain tells if it can be merged as it is,
+    # with all keys below it plain strings and all containers of its uri
+    frozen = False
+    plain = False
+
     def __init__(self, *args, **kwargs):
         self._uri = kwargs.pop('uri', None)
         dict.__init__(self, *args, **kwargs)
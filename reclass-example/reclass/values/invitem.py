@@ -20,9 +20,119 @@ from reclass.values import item
 from reclass.values import parser_funcs
 from reclass.settings import Settings
 from reclass.utils.dictpath import DictPath
+from reclass.utils.inventory import Inventory
 from reclass.errors import ExpressionError, ParseError, ResolveError
 
 
+# stands in for values whose path exists but cannot be resolved
+_UNRESOLVED = object()
+
+
+def _lookup(path, parts, exports):
+    # (True, value) if path exists in exports, else (False, None), going
+    # through DictPath for anything but plain nested dicts
+    item = exports
+    if parts:
+        for part in parts:
+            if isinstance(item, dict) and part in item:
+                item = item[part]
+            else:
+                break
+        else:
+            return True, item
+    if not path.exists_in(exports):
+        return False, None
+    try:
+        return True, path.get_value(exports)
+    except KeyError:
+        return True, _UNRESOLVED
+
+
+class _PathIndex(object):
+    '''
+    The values of an export path in the nodes of an inventory by node
+    position, and the node positions by value for equality tests.
+    '''
+
+    def __init__(self, path, exports):
+        self._path = path
+        self.found = {}
+        self._by_value = {}
+        self._unhashable = []
+        self._unresolved = False
+        found = self.found
+        by_value = self._by_value
+        parts = tuple(path.path)
+        for pos, items in enumerate(exports):
+            ok, value = _lookup(path, parts, items)
+            if not ok:
+                continue
+            found[pos] = value
+            if value is _UNRESOLVED:
+                self._unresolved = True
+                continue
+            try:
+                positions = by_value.get(value)
+            except TypeError:
+                self._unhashable.append(pos)
+                continue
+            if positions is None:
+                by_value[value] = [pos]
+            else:
+                positions.append(pos)
+
+    def get(self, pos):
+        value = self.found[pos]
+        if value is _UNRESOLVED:
+            raise ResolveError(str(self._path))
+        return value
+
+    def equal(self, value):
+        if self._unresolved:
+            raise ResolveError(str(self._path))
+        try:
+            matching = set(self._by_value.get(value, ()))
+        except TypeError:
+            return set(pos for (pos, v) in iteritems(self.found) if v == value)
+        matching.update(pos for pos in self._unhashable if self.found[pos] == value)
+        return matching
+
+    def not_equal(self, value):
+        return set(self.found) - self.equal(value)
+
+
+class _InventoryIndex(object):
+    '''
+    Positions of the nodes of an inventory and the indexes of the export
+    paths queried so far.
+    '''
+
+    def __init__(self, inventory):
+        self.nodes = list(inventory)
+        self._exports = [ inventory[n] for n in self.nodes ]
+        self._paths = {}
+
+    def all(self):
+        return set(range(len(self.nodes)))
+
+    def path(self, path):
+        key = tuple(path.path)
+        index = self._paths.get(key)
+        if index is None:
+            index = self._paths[key] = _PathIndex(path, self._exports)
+        return index
+
+
+def _inventory_index(inventory):
+    # indexes are kept with an Inventory, plain dicts get a new one
+    index = getattr(inventory, 'index', None)
+    if index is None:
+        index = _InventoryIndex(inventory)
+        if isinstance(inventory, Inventory):
+            inventory.index = index
+    return index
+
+
 # TODO: generalize expression handling.
 class BaseTestExpression(object):
 
@@ -35,8 +145,8 @@ class BaseTestExpression(object):
 
 class EqualityTest(BaseTestExpression):
 
-    known_operators = { parser_funcs.EQUAL: operator.eq,
-                        parser_funcs.NOT_EQUAL: operator.ne}
+    known_operators = { parser_funcs.EQUAL: _PathIndex.equal,
+                        parser_funcs.NOT_EQUAL: _PathIndex.not_equal}
 
     def __init__(self, expression, delimiter):
         # expression is a list of at least three tuples, of which first element
@@ -64,17 +174,17 @@ class EqualityTest(BaseTestExpression):
             self._parameter_path.drop_first()
             self.refs = [str(self._parameter_path)]
 
-    def value(self, context, items):
+    def matching(self, context, index):
+        ''' Positions of the nodes in index passing the test '''
+        # the value of a self: parameter is kept local, as parsed tests are
+        # shared by the items of all nodes
+        value = self._parameter_value
         if self._parameter_path is not None:
-            self._parameter_value = self._resolve(self._parameter_path,
-                                                  context)
-        if self._parameter_value is None:
+            value = self._resolve(self._parameter_path, context)
+        if value is None:
             raise ExpressionError('Failed to render %s' % str(self),
                                   tbFlag=False)
-        if self._export_path.exists_in(items):
-            export_value = self._resolve(self._export_path, items)
-            return self._compare(export_value, self._parameter_value)
-        return False
+        return self._compare(index.path(self._export_path), value)
 
     def _resolve(self, path, dictionary):
         try:
@@ -102,6 +212,7 @@ class EqualityTest(BaseTestExpression):
 
 class LogicTest(BaseTestExpression):
 
+    # applied to the sets of matching node positions
     known_operators = { parser_funcs.AND: operator.and_,
                         parser_funcs.OR: operator.or_}
 
@@ -119,15 +230,24 @@ class LogicTest(BaseTestExpression):
             msg = 'Unknown operator {0} {1}'.format(e.messsage, self._els)
             raise ExpressionError(msg, tbFlag=False)
 
-    def value(self, context, items):
+    def matching(self, context, index):
+        ''' Positions of the nodes in index passing the test '''
         if len(self._els) == 0:  # NOTE: possible logic error
-            return True
-        result = self._els[0].value(context, items)
+            return index.all()
+        result = self._els[0].matching(context, index)
         for op, next_el in zip(self._ops, self._els[1:]):
-            result = op(result, next_el.value(context, items))
+            result = op(result, next_el.matching(context, index))
         return result
 
 
+# distinct queries whose (options, expression type, expression) are kept
+EXPRESSION_CACHE_SIZE = 1000
+
+# parsed queries by query string, the expression grammar does not depend
+# on the settings
+_parsed_expressions = parser_funcs.ParseCache(EXPRESSION_CACHE_SIZE)
+
+
 class InvItem(item.Item):
 
     type = item.ItemTypes.INV_QUERY
@@ -141,21 +261,17 @@ class InvItem(item.Item):
         self._parse_expression(self.contents)
 
     def _parse_expression(self, expr):
-        parser = parser_funcs.get_expression_parser()
-        try:
-            tokens = parser.parseString(expr).asList()
-        except pp.ParseException as e:
-            raise ParseError(e.msg, e.line, e.col, e.lineno)
-
-        if len(tokens) == 2:  # options are set
-            passed_opts = [x[1] for x in tokens.pop(0)]
-            self.ignore_failed_render = parser_funcs.IGNORE_ERRORS in passed_opts
-            self.needs_all_envs = parser_funcs.ALL_ENVS in passed_opts
-        elif len(tokens) > 2:
-            raise ExpressionError('Failed to parse %s' % str(tokens),
-                                  tbFlag=False)
-        self._expr_type = tokens[0][0]
-        self._expr = list(tokens[0][1])
+        parsed = _parsed_expressions.get(expr)
+        if parsed is None:
+            parsed = self._tokenize_expression(expr)
+            _parsed_expressions.put(expr, parsed)
+        options, expr_type, expression = parsed
+
+        if options is not None:
+            self.ignore_failed_render = parser_funcs.IGNORE_ERRORS in options
+            self.needs_all_envs = parser_funcs.ALL_ENVS in options
+        self._expr_type = expr_type
+        self._expr = list(expression)
 
         if self._expr_type == parser_funcs.VALUE:
             self._value_path = DictPath(self._settings.delimiter,
@@ -179,6 +295,22 @@ class InvItem(item.Item):
             msg = 'Unknown expression type: %s'
             raise ExpressionError(msg % self._expr_type, tbFlag=False)
 
+    @staticmethod
+    def _tokenize_expression(expr):
+        parser = parser_funcs.get_expression_parser()
+        try:
+            tokens = parser.parseString(expr).asList()
+        except pp.ParseException as e:
+            raise ParseError(e.msg, e.line, e.col, e.lineno)
+
+        options = None
+        if len(tokens) == 2:  # options are set
+            options = [x[1] for x in tokens.pop(0)]
+        elif len(tokens) > 2:
+            raise ExpressionError('Failed to parse %s' % str(tokens),
+                                  tbFlag=False)
+        return options, tokens[0][0], tuple(tokens[0][1])
+
     @property
     def has_references(self):
         return len(self._question.refs) > 0
@@ -192,18 +324,12 @@ class InvItem(item.Item):
     def get_inv_references(self):
         return self.inv_refs
 
-    def _resolve(self, path, dictionary):
-        try:
-            return path.get_value(dictionary)
-        except KeyError as e:
-            raise ResolveError(str(path))
-
     def _value_expression(self, inventory):
+        index = _inventory_index(inventory)
+        values = index.path(self._value_path)
         results = {}
-        for (node, items) in iteritems(inventory):
-            if self._value_path.exists_in(items):
-                results[node] = copy.deepcopy(self._resolve(self._value_path,
-                                              items))
+        for pos in sorted(values.found):
+            results[index.nodes[pos]] = copy.deepcopy(values.get(pos))
         return results
 
     def _test_expression(self, context, inventory):
@@ -212,19 +338,21 @@ class InvItem(item.Item):
             raise ExpressionError(msg % str(self), tbFlag=False)
 
         results = {}
-        for node, items in iteritems(inventory):
-            if (self._question.value(context, items) and
-                    self._value_path.exists_in(items)):
-                results[node] = copy.deepcopy(
-                    self._resolve(self._value_path, items))
+        if len(inventory) == 0:
+            return results
+        index = _inventory_index(inventory)
+        values = index.path(self._value_path)
+        for pos in sorted(self._question.matching(context, index)):
+            if pos in values.found:
+                results[index.nodes[pos]] = copy.deepcopy(values.get(pos))
         return results
 
     def _list_test_expression(self, context, inventory):
-        results = []
-        for (node, items) in iteritems(inventory):
-            if self._question.value(context, items):
-                results.append(node)
-        return results
+        if len(inventory) == 0:
+            return []
+        index = _inventory_index(inventory)
+        return [ index.nodes[pos]
+                 for pos in sorted(self._question.matching(context, index)) ]
 
     def render(self, context, inventory):
         if self._expr_type == parser_funcs.VALUE:
@@ -8,6 +8,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import copy
+
 from enum import Enum
 
 from reclass.utils.dictpath import DictPath
@@ -49,6 +51,10 @@ class Item(object):
     def type_str(self):
         return self.type.name.lower()
 
+    def clone(self):
+        # items are not changed once parsed, so they can be shared
+        return self
+
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.contents)
 
@@ -70,6 +76,14 @@ class ItemWithReferences(Item):
     def get_references(self):
         return self._refs
 
+    def clone(self):
+        # the references are assembled again for every context, so each
+        # user needs its own copy
+        result = copy.copy(self)
+        result.contents = [ i.clone() for i in self.contents ]
+        result._refs = self._refs[:]
+        return result
+
     # NOTE: possibility of confusion. Looks like 'assemble' should be either
     # 'gather' or 'extract'.
     def assembleRefs(self, context={}):
@@ -13,6 +13,5 @@ class ListItem(item.ContainerItem):
 
     def merge_over(self, other):
         if other.type == item.ItemTypes.LIST:
-            other.contents.extend(self.contents)
-            return other
+            return ListItem(other.contents + self.contents, self._settings)
         raise RuntimeError('Failed to merge %s over %s'  % (self, other))
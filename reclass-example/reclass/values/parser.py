@@ -19,71 +19,99 @@ from reclass.errors import ParseError
 from reclass.values.parser_funcs import tags
 import reclass.values.parser_funcs as parsers
 
-import collections
 import six
+import threading
 
 
-class Parser(object):
+# distinct strings whose parsed items are kept
+CACHE_SIZE = 10000
+
 
-    def __init__(self):
+class _CompiledParsers(object):
+    '''
+    The parsers and parsed items for one set of settings. Items hold on to
+    the settings they were parsed with, so they are only shared between
+    equal settings.
+    '''
+
+    def __init__(self, settings, cache_size):
+        self.settings = settings
+        self.scanner = parsers.get_ref_scanner(settings)
+        self.cache = parsers.ParseCache(cache_size)
         self._ref_parser = None
-        self._simple_parser = None
-        self._old_settings = None
+        self._lock = threading.Lock()
 
     @property
     def ref_parser(self):
-        if self._ref_parser is None or self._settings != self._old_settings:
-            self._ref_parser = parsers.get_ref_parser(self._settings)
-            self._old_settings = self._settings
-        return self._ref_parser
+        # the pyparsing grammar is only needed for what the scanner leaves
+        with self._lock:
+            if self._ref_parser is None:
+                self._ref_parser = parsers.get_ref_parser(self.settings)
+            return self._ref_parser
 
-    @property
-    def simple_ref_parser(self):
-        if self._simple_parser is None or self._settings != self._old_settings:
-            self._simple_parser = parsers.get_simple_ref_parser(self._settings)
-            self._old_settings = self._settings
-        return self._simple_parser
 
-    def parse(self, value, settings):
-        def full_parse():
-            try:
-                return self.ref_parser.parseString(value)
-            except pp.ParseException as e:
-                raise ParseError(e.msg, e.line, e.col, e.lineno)
+class Parser(object):
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self._cache_size = cache_size
+        self._registry = {}
+        self._lock = threading.Lock()
+
+    def cache_stats(self):
+        stats = {'hits': 0, 'misses': 0, 'entries': 0, 'size': 0}
+        for compiled in list(self._registry.values()):
+            for key, value in six.iteritems(compiled.cache.stats()):
+                stats[key] += value
+        return stats
+
+    def _compiled(self, settings):
+        compiled = self._registry.get(settings.fingerprint)
+        if compiled is None:
+            with self._lock:
+                compiled = self._registry.get(settings.fingerprint)
+                if compiled is None:
+                    compiled = _CompiledParsers(settings, self._cache_size)
+                    self._registry[settings.fingerprint] = compiled
+        return compiled
 
-        self._settings = settings
+    def parse(self, value, settings):
         sentinel_count = (value.count(settings.reference_sentinels[0]) +
                           value.count(settings.export_sentinels[0]))
         if sentinel_count == 0:
-            # speed up: only use pyparsing if there are sentinels in the value
-            return ScaItem(value, self._settings)
-        elif sentinel_count == 1:  # speed up: try a simple reference
-            try:
-                tokens = self.simple_ref_parser.parseString(value)
-            except pp.ParseException:
-                tokens = full_parse()  # fall back on the full parser
-        else:
-            tokens = full_parse()  # use the full parser
-
-        tokens = parsers.listify(tokens)
-        items = self._create_items(tokens)
-        if len(items) == 1:
-            return items[0]
-        return CompItem(items, self._settings)
-
-    _item_builders = {tags.STR: (lambda s, v: ScaItem(v, s._settings)),
-                      tags.REF: (lambda s, v: s._create_ref(v)),
-                      tags.INV: (lambda s, v: s._create_inv(v)) }
-
-    def _create_items(self, tokens):
-        return [self._item_builders[t](self, v) for t, v in tokens ]
-
-    def _create_ref(self, tokens):
-        items = [ self._item_builders[t](self, v) for t, v in tokens ]
-        return RefItem(items, self._settings)
-
-    def _create_inv(self, tokens):
-        items = [ScaItem(v, self._settings) for t, v in tokens]
+            # speed up: only parse if there are sentinels in the value
+            return ScaItem(value, settings)
+        compiled = self._compiled(settings)
+        item = compiled.cache.get(value)
+        if item is None:
+            tokens = compiled.scanner(value)
+            if tokens is None:
+                # the scanner leaves errors and references with whitespace
+                # to the full parser
+                try:
+                    tokens = parsers.listify(compiled.ref_parser.parseString(value))
+                except pp.ParseException as e:
+                    raise ParseError(e.msg, e.line, e.col, e.lineno)
+            items = self._create_items(tokens, settings)
+            if len(items) == 1:
+                item = items[0]
+            else:
+                item = CompItem(items, settings)
+            compiled.cache.put(value, item)
+        return item.clone()
+
+    _item_builders = {tags.STR: (lambda s, v, settings: ScaItem(v, settings)),
+                      tags.REF: (lambda s, v, settings: s._create_ref(v, settings)),
+                      tags.INV: (lambda s, v, settings: s._create_inv(v, settings)) }
+
+    def _create_items(self, tokens, settings):
+        return [self._item_builders[t](self, v, settings) for t, v in tokens ]
+
+    def _create_ref(self, tokens, settings):
+        items = [ self._item_builders[t](self, v, settings) for t, v in tokens ]
+        return RefItem(items, settings)
+
+    def _create_inv(self, tokens, settings):
+        items = [ScaItem(v, settings) for t, v in tokens]
         if len(items) == 1:
-            return InvItem(items[0], self._settings)
-        return InvItem(CompItem(items), self._settings)
+            return InvItem(items[0], settings)
+        return InvItem(CompItem(items), settings)
@@ -12,7 +12,14 @@ import collections
 import enum
 import functools
 import pyparsing as pp
+import re
 import six
+import threading
+
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
 
 tags = enum.Enum('Tags', ['STR', 'REF', 'INV'])
 
@@ -37,6 +44,41 @@ ALL_ENVS = '+AllEnvs'
 
 s_end = pp.StringEnd()
 
+class ParseCache(object):
+    '''
+    Bounded cache of parse results, dropping the least recently used ones
+    first.
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                item = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._items[key] = item
+            self.hits += 1
+            return item
+
+    def put(self, key, item):
+        with self._lock:
+            self._items[key] = item
+            if len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._items), 'size': self.size}
+
+
 def _tag_with(tag, transform=lambda x:x):
     def inner(tag, string, location, tokens):
         token = transform(tokens[0])
@@ -49,7 +91,7 @@ def _asList(x):
     return x
 
 def listify(w, modifier=_asList):
-    if (isinstance(w, collections.Iterable) and
+    if (isinstance(w, Iterable) and
             not isinstance(w, six.string_types)):
         cls = type(w)
         if cls == pp.ParseResults:
@@ -57,7 +99,16 @@ def listify(w, modifier=_asList):
         return cls([listify(x) for x in w])
     return modifier(w)
 
+_expression_parser = None
+
 def get_expression_parser():
+    # the grammar does not depend on the settings, so it is built only once
+    global _expression_parser
+    if _expression_parser is None:
+        _expression_parser = _build_expression_parser()
+    return _expression_parser
+
+def _build_expression_parser():
     sign = pp.Optional(pp.Literal('-'))
     number = pp.Word(pp.nums)
     dpoint = pp.Literal('.')
@@ -163,16 +214,126 @@ def get_ref_parser(settings):
     return line.leaveWhitespace()
 
 
-def get_simple_ref_parser(settings):
+def get_ref_scanner(settings):
+    """Return a hand-written equivalent of the parser of get_ref_parser.
 
+    The returned function scans a string in a single pass and returns the
+    same list of (tag, value) tokens as listify(parser.parseString(string)),
+    or None if the string is not one it can scan. These are the strings the
+    grammar rejects, and references containing whitespace, where pyparsing
+    skips some of the whitespace in a version dependent way. Callers fall
+    back on the pyparsing grammar for both.
+    """
     ESCAPE = settings.escape_character
+    DOUBLE_ESCAPE = ESCAPE + ESCAPE
     REF_OPEN, REF_CLOSE = settings.reference_sentinels
     INV_OPEN, INV_CLOSE = settings.export_sentinels
-    EXCLUDES = ESCAPE + REF_OPEN + REF_CLOSE + INV_OPEN + INV_CLOSE
+    SENTINELS = (REF_OPEN, REF_CLOSE, INV_OPEN, INV_CLOSE)
+    REF_ESCAPE_OPEN, REF_ESCAPE_CLOSE = ESCAPE + REF_OPEN, ESCAPE + REF_CLOSE
+    INV_ESCAPE_OPEN, INV_ESCAPE_CLOSE = ESCAPE + INV_OPEN, ESCAPE + INV_CLOSE
+    WHITESPACE = ' \t\n\r'
 
-    string = pp.CharsNotIn(EXCLUDES).setParseAction(_tag_with(tags.STR))
-    ref_open = pp.Literal(REF_OPEN).suppress()
-    ref_close = pp.Literal(REF_CLOSE).suppress()
-    reference = (ref_open + pp.Group(string) + ref_close).setParseAction(_tag_with(tags.REF))
-    line = pp.StringStart() + pp.Optional(string) + reference + pp.Optional(string) + s_end
-    return line.leaveWhitespace()
+    def _not_at(*sentinels):
+        patterns = []
+        for sentinel in sentinels:
+            patterns.extend([sentinel, ESCAPE + sentinel, DOUBLE_ESCAPE + sentinel])
+        return '(?!{0})'.format('|'.join(re.escape(p) for p in patterns))
+
+    def _chars_not_in(chars):
+        return '[^{0}]'.format(''.join(re.escape(c) for c in set(chars)))
+
+    # Runs of plain text up to the next sentinel that cannot be part of it.
+    # All the sentinels start with an excluded character, so the look-ahead
+    # is only needed in front of those.
+    text = re.compile('(?:{0}+|{1}.)+'.format(
+        _chars_not_in(ESCAPE + REF_OPEN + REF_CLOSE + INV_OPEN + INV_CLOSE),
+        _not_at(REF_OPEN, INV_OPEN)), re.DOTALL)
+    ref_text = re.compile('(?:{0}+|{1}{2})+'.format(
+        _chars_not_in(ESCAPE + REF_OPEN + REF_CLOSE + WHITESPACE),
+        _not_at(REF_OPEN, REF_CLOSE),
+        _chars_not_in(REF_CLOSE[0] + WHITESPACE)))
+    inv_text = re.compile('{0}{1}+'.format(_not_at(INV_CLOSE), _chars_not_in(INV_CLOSE[0])))
+
+    def double_escape(string, pos):
+        if string.startswith(DOUBLE_ESCAPE, pos):
+            end = pos + len(DOUBLE_ESCAPE)
+            if any(string.startswith(s, end) for s in SENTINELS):
+                return end
+        return None
+
+    def scan_escapes(string, pos, escapes):
+        end = double_escape(string, pos)
+        if end is not None:
+            return ESCAPE, end
+        for escaped, replacement in escapes:
+            if string.startswith(escaped, pos):
+                return replacement, pos + len(escaped)
+        return None, pos
+
+    def scan_reference(string, pos):
+        # pos is just after the opening sentinel
+        items = []
+        while True:
+            if string.startswith(REF_OPEN, pos):
+                item, end = scan_reference(string, pos + len(REF_OPEN))
+                if item is None:
+                    return None, pos
+                items.append(item)
+                pos = end
+                continue
+            value, end = scan_escapes(string, pos, ((REF_ESCAPE_OPEN, REF_OPEN),
+                                                    (REF_ESCAPE_CLOSE, REF_CLOSE)))
+            if value is None:
+                match = ref_text.match(string, pos)
+                if match is None:
+                    break
+                value, end = match.group(), match.end()
+            items.append((tags.STR, value))
+            pos = end
+        if not items or not string.startswith(REF_CLOSE, pos):
+            return None, pos
+        return (tags.REF, items), pos + len(REF_CLOSE)
+
+    def scan_export(string, pos):
+        # pos is just after the opening sentinel
+        items = []
+        while True:
+            value, end = scan_escapes(string, pos, ((INV_ESCAPE_OPEN, INV_OPEN),
+                                                    (INV_ESCAPE_CLOSE, INV_CLOSE)))
+            if value is None:
+                match = inv_text.match(string, pos)
+                if match is None:
+                    break
+                value, end = match.group(), match.end()
+            items.append((tags.STR, value))
+            pos = end
+        if not items or not string.startswith(INV_CLOSE, pos):
+            return None, pos
+        return (tags.INV, items), pos + len(INV_CLOSE)
+
+    def scan(string):
+        tokens = []
+        pos = 0
+        length = len(string)
+        while pos < length:
+            item = None
+            if string.startswith(REF_OPEN, pos):
+                item, end = scan_reference(string, pos + len(REF_OPEN))
+            if item is None and string.startswith(INV_OPEN, pos):
+                item, end = scan_export(string, pos + len(INV_OPEN))
+            if item is None:
+                value, end = scan_escapes(string, pos, ((REF_ESCAPE_OPEN, REF_OPEN),
+                                                        (INV_ESCAPE_OPEN, INV_OPEN)))
+                if value is None:
+                    match = text.match(string, pos)
+                    if match is None:
+                        return None
+                    value, end = match.group(), match.end()
+                item = (tags.STR, value)
+            tokens.append(item)
+            pos = end
+        if not tokens:
+            return None
+        return tokens
+
+    return scan
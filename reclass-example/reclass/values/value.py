@@ -8,6 +8,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import copy
+
 from .parser import Parser
 from .dictitem import DictItem
 from .listitem import ListItem
@@ -97,8 +99,9 @@ class Value(object):
         return self._item.contents
 
     def merge_over(self, value):
-        self._item = self._item.merge_over(value._item)
-        return self
+        merged = copy.copy(self)
+        merged._item = self._item.merge_over(value._item)
+        return merged
 
     def __repr__(self):
         return 'Value(%r)' % self._item
@@ -11,6 +11,9 @@ from __future__ import unicode_literals
 import copy
 import sys
 
+from six import iteritems
+
+from .value import Value
 from reclass.errors import ChangedConstantError, ResolveError, TypeMergeError
 
 
@@ -20,33 +23,54 @@ class ValueList(object):
         self._settings = settings
         self._refs = []
         self.allRefs = True
-        self._values = [value]
+        self._values = []
         self._inv_refs = []
         self.has_inv_query = False
         self.ignore_failed_render = False
         self.is_complex = False
-        self._update()
+        self._add(value)
+
+    def __copy__(self):
+        cls = self.__class__
+        result = cls.__new__(cls)
+        result.__dict__.update(self.__dict__)
+        result._values = self._values[:]
+        result._refs = self._refs[:]
+        result._inv_refs = self._inv_refs[:]
+        return result
 
     @property
     def uri(self):
         return '; '.join([str(x.uri) for x in self._values])
 
     def append(self, value):
-        self._values.append(value)
-        self._update()
+        self._add(value)
 
     def extend(self, values):
-        self._values.extend(values._values)
-        self._update()
+        for value in list(values._values):
+            self._add(value)
 
-    def _update(self):
-        self.assembleRefs()
-        self._check_for_inv_query()
-        self.is_complex = False
-        item_type = self._values[0].item_type()
-        for v in self._values:
-            if v.is_complex or v.constant or v.overwrite or v.item_type() != item_type:
-                self.is_complex = True
+    def _add(self, value):
+        # the references, inventory queries and complexity of the list are
+        # updated with those of the added value only, so that building a
+        # list takes linear time
+        self._values.append(value)
+        value.assembleRefs({})
+        if value.has_references:
+            self._refs.extend(value.get_references())
+        if value.allRefs is False:
+            self.allRefs = False
+        if value.has_inv_query:
+            self._inv_refs.extend(value.get_inv_references())
+            ignore = value.ignore_failed_render() is not False
+            if self.has_inv_query:
+                self.ignore_failed_render = self.ignore_failed_render and ignore
+            else:
+                self.ignore_failed_render = ignore
+            self.has_inv_query = True
+        if (value.is_complex or value.constant or value.overwrite
+                or value.item_type() != self._values[0].item_type()):
+            self.is_complex = True
 
     @property
     def has_references(self):
@@ -58,18 +82,6 @@ class ValueList(object):
     def get_references(self):
         return self._refs
 
-    def _check_for_inv_query(self):
-        self.has_inv_query = False
-        self.ignore_failed_render = True
-        for value in self._values:
-            if value.has_inv_query:
-                self._inv_refs.extend(value.get_inv_references())
-                self.has_inv_query = True
-                if value.ignore_failed_render() is False:
-                    self.ignore_failed_render = False
-        if self.has_inv_query is False:
-            self.ignore_failed_render = False
-
     def assembleRefs(self, context={}):
         self._refs = []
         self.allRefs = True
@@ -96,13 +108,176 @@ class ValueList(object):
                 output = value.merge_over(output)
         return output
 
-    def render(self, context, inventory):
-        from reclass.datatypes.parameters import Parameters
+    def _unwrap(self, value):
+        # the plain data of a value needing no interpolation, as
+        # Parameters._render_simple_container renders it
+        if isinstance(value, ValueList):
+            if value.is_complex:
+                return value
+            value = value.merge()
+        if isinstance(value, Value):
+            if value.is_complex:
+                return value
+            elif value.is_container():
+                return value.contents
+            return value.render(None, None)
+        return value
+
+    def _prefix_constants(self, value, path, constants):
+        # the merged dict value with the prefix of its constant keys put
+        # back, so that merging it again fixes them again
+        result = {}
+        for (key, v) in iteritems(value):
+            key_path = path + (key,)
+            if isinstance(v, dict):
+                v = self._prefix_constants(v, key_path, constants)
+            if key_path in constants:
+                key = self._settings.dict_key_constant_prefix + key
+            result[key] = v
+        return result
 
+    def _constant(self, value, path, constants):
+        # the constant merged value at path as a value which keeps out the
+        # values merged after it
+        if isinstance(value, ValueList):
+            return value
+        elif isinstance(value, Value):
+            value = copy.copy(value)
+        else:
+            if isinstance(value, dict) and len(constants) > 0:
+                value = self._prefix_constants(value, path, constants)
+            value = Value(value, self._settings, None, parse_string=False)
+        value.constant = True
+        return value
+
+    def _defer(self, cur, new, path, constants):
+        # values still to be interpolated, and values which cannot be
+        # merged, are merged later, when the parameters render the value
+        # list made of them. Like that errors name the path of the values
+        # and are only raised if nothing is merged over them before.
+        if isinstance(cur, ValueList):
+            values = copy.copy(cur)
+        elif isinstance(cur, Value):
+            values = ValueList(cur, self._settings)
+        else:
+            if isinstance(cur, dict) and len(constants) > 0:
+                cur = self._prefix_constants(cur, path, constants)
+            values = ValueList(Value(cur, self._settings, None, parse_string=False),
+                               self._settings)
+        if isinstance(new, ValueList):
+            values.extend(new)
+        elif isinstance(new, Value):
+            values.append(new)
+        else:
+            values.append(Value(new, self._settings, None, parse_string=False))
+        return values
+
+    def _replace(self, value, path, constants):
+        # value replaces what is at path, including its constants
+        if len(constants) > 0:
+            n = len(path)
+            constants.difference_update([c for c in constants if c[:n] == path])
+        if isinstance(value, dict):
+            return self._merge_dict({}, value, path, constants)
+        return value
+
+    def _merge_value(self, cur, new, path, constants):
+        plain_cur, plain_new = self._unwrap(cur), self._unwrap(new)
+        if isinstance(plain_cur, (Value, ValueList)) or isinstance(plain_new, (Value, ValueList)):
+            return self._defer(cur, new, path, constants)
+        if plain_cur is not cur and isinstance(plain_cur, dict):
+            # the contents of a value are merged as they were written
+            plain_cur = self._merge_dict({}, plain_cur, path, constants)
+        if plain_cur is None:
+            # as rendering a value list would, any value replaces None
+            return self._replace(new, path, constants)
+        # a value replacing cur is kept as it was written, see _merge_dict
+        cur, replacement, new = plain_cur, new, plain_new
+        if isinstance(cur, dict):
+            if isinstance(new, dict):
+                return self._merge_dict(cur, new, path, constants)
+            elif isinstance(new, list):
+                return self._defer(cur, new, path, constants)
+            elif self._settings.allow_scalar_over_dict or (self._settings.allow_none_override and new is None):
+                return self._replace(replacement, path, constants)
+            return self._defer(cur, new, path, constants)
+        elif isinstance(cur, list):
+            if isinstance(new, list):
+                return cur + new
+            elif isinstance(new, dict):
+                return self._defer(cur, new, path, constants)
+            elif self._settings.allow_scalar_over_list or (self._settings.allow_none_override and new is None):
+                return replacement
+            return self._defer(cur, new, path, constants)
+        elif isinstance(new, dict):
+            if self._settings.allow_dict_over_scalar:
+                return self._replace(replacement, path, constants)
+            return self._defer(cur, new, path, constants)
+        elif isinstance(new, list):
+            if self._settings.allow_list_over_scalar:
+                return [ cur ] + new
+            return self._defer(cur, new, path, constants)
+        return replacement
+
+    def _merge_dict(self, cur, new, path, constants):
+        # Merge the rendered dict new into cur, a dict made by _merge_dict,
+        # giving the data merging both as Parameters and rendering the result
+        # would, without wrapping every value: keys become strings, prefixed
+        # keys override or fix values and the values under a key are merged
+        # like the values of a list in render. Values still to be
+        # interpolated are merged later, see _defer. path holds the keys of
+        # cur below the rendered value, constants the paths of the constant
+        # values merged so far.
+        prefixes = self._settings.dict_key_prefixes
+        for (key, value) in iteritems(new):
+            key = str(key)
+            overwrite, constant = False, False
+            if isinstance(value, Value):
+                overwrite, constant = value.overwrite, value.constant
+            elif isinstance(value, ValueList):
+                # a constant value keeps the values merged after it out
+                constant = any(v.constant for v in value._values)
+            if key[0] in prefixes:
+                if key[0] == self._settings.dict_key_override_prefix:
+                    overwrite = True
+                elif key[0] == self._settings.dict_key_constant_prefix:
+                    constant = True
+                key = key[1:]
+                if isinstance(value, dict):
+                    # as in Parameters, the dict of a prefixed key is kept as
+                    # it was written until something is merged over it
+                    value = Value(value, self._settings, None, parse_string=False)
+            key_path = path + (key,)
+            if key_path in constants:
+                if self._settings.strict_constant_parameters:
+                    cur[key] = self._defer(self._constant(cur[key], key_path, constants),
+                                           value, key_path, constants)
+                continue
+            old = cur.get(key)
+            if overwrite and isinstance(old, ValueList) and old.is_complex:
+                # as in Parameters a value overriding a merge still to be
+                # done is merged after it, and overrides it when rendered
+                if isinstance(value, Value):
+                    value = copy.copy(value)
+                elif not isinstance(value, ValueList):
+                    value = Value(value, self._settings, None, parse_string=False)
+                if isinstance(value, Value):
+                    value.overwrite = True
+                cur[key] = self._defer(old, value, key_path, constants)
+            elif old is None or overwrite:
+                cur[key] = self._replace(value, key_path, constants)
+            else:
+                cur[key] = self._merge_value(old, value, key_path, constants)
+            if constant:
+                constants.add(key_path)
+        return cur
+
+    def render(self, context, inventory):
         output = None
         deepCopied = False
         last_error = None
         constant = False
+        constants = set()
         for n, value in enumerate(self._values):
             try:
                 new = value.render(context, inventory)
@@ -133,10 +308,11 @@ class ValueList(object):
             else:
                 if isinstance(output, dict):
                     if isinstance(new, dict):
-                        p1 = Parameters(output, self._settings, None, parse_strings=False)
-                        p2 = Parameters(new, self._settings, None, parse_strings=False)
-                        p1.merge(p2)
-                        output = p1.as_dict()
+                        if not deepCopied:
+                            constants.clear()
+                            output = self._merge_dict({}, output, (), constants)
+                            deepCopied = True
+                        output = self._merge_dict(output, new, (), constants)
                     elif isinstance(new, list):
                         raise TypeMergeError(self._values[n], self._values[n-1], self.uri)
                     elif self._settings.allow_scalar_over_dict or (self._settings.allow_none_override and new is None):